@@ -1,9 +1,18 @@
 import os
 import logging
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
+from json_utils import ORJSON_AVAILABLE, dumps, loads
+
+# Optional response compression
+try:
+    from flask_compress import Compress
+    COMPRESS_AVAILABLE = True
+except ImportError:
+    COMPRESS_AVAILABLE = False
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -24,11 +33,37 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,
     "pool_pre_ping": True,
 }
+if ORJSON_AVAILABLE:
+    # Used for JSON columns such as DocumentSet.extracted_data
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"].update(
+        json_serializer=lambda obj: dumps(obj).decode(),
+        json_deserializer=loads,
+    )
+
+if ORJSON_AVAILABLE:
+    class OrjsonProvider(DefaultJSONProvider):
+        """jsonify and request.get_json backed by orjson; keys are left unsorted"""
+        
+        def dumps(self, obj, **kwargs):
+            # Dates still go through Flask's default so they keep its HTTP date format
+            return dumps(obj, indent=bool(kwargs.get('indent')), default=self.default).decode()
+        
+        def loads(self, s, **kwargs):
+            return loads(s)
+    
+    app.json = OrjsonProvider(app)
+
+if COMPRESS_AVAILABLE:
+    # PDFs are already compressed, so only text responses are worth compressing
+    app.config['COMPRESS_MIMETYPES'] = ['text/html', 'text/css', 'application/javascript', 'application/json']
+    Compress(app)
 
 # Configure upload settings
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['GENERATED_FOLDER'] = 'generated'
+# Only behind a proxy that serves X-Sendfile (e.g. Apache mod_xsendfile); gunicorn already uses sendfile(2)
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
 
 # Create directories if they don't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -43,6 +78,29 @@ with app.app_context():
     import routes
     
     db.create_all()
+    
+    # create_all skips indexes on tables that already exist
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    
+    # create_all doesn't alter existing tables; add the processing state columns
+    from sqlalchemy import inspect, text
+    columns = {column['name']: column['type'] for column in inspect(db.engine).get_columns('document_set')}
+    for name, column_type in (('status', 'VARCHAR(20)'), ('processing_error', 'TEXT'),
+                              ('processing_started_at', 'TIMESTAMP')):
+        if name not in columns:
+            with db.engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE document_set ADD COLUMN {name} {column_type}"))
+    
+    # and upgrade extracted_data from TEXT to JSONB
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import JSONB
+        if not isinstance(columns.get('extracted_data'), JSONB):
+            with db.engine.begin() as connection:
+                connection.execute(text(
+                    "ALTER TABLE document_set ALTER COLUMN extracted_data TYPE JSONB USING extracted_data::jsonb"
+                ))
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
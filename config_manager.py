@@ -1,36 +1,73 @@
 import os
-import json
 import logging
+import mmap
+import tempfile
 from typing import Dict, Any, Optional
+from json_utils import dumps, loads
+
+# Config files above this size are memory-mapped instead of read into memory
+MMAP_THRESHOLD = 4096
 
 class ConfigManager:
     """Manages application configuration including API keys"""
     
+    # fsync makes every save much slower; atomic replace alone keeps the file consistent
+    FSYNC = False
+    
     def __init__(self):
         self.config_file = 'app_config.json'
         self.logger = logging.getLogger(__name__)
         self.config = self.load_config()
+        self._dirty = False
     
     def load_config(self) -> Dict[str, Any]:
         """Load configuration from file"""
-        if os.path.exists(self.config_file):
-            try:
-                with open(self.config_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                self.logger.error(f"Error loading config: {e}")
-                return {}
-        return {}
+        try:
+            with open(self.config_file, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size <= MMAP_THRESHOLD:
+                    return self._parse(f.read())
+                # Parse larger files straight out of the page cache
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    with memoryview(mm) as view:
+                        return self._parse(view)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Error loading config: {e}")
+            return {}
+    
+    def _parse(self, data) -> Dict[str, Any]:
+        """Parse JSON from a bytes-like buffer"""
+        return loads(data)
     
     def save_config(self) -> bool:
         """Save configuration to file"""
+        if not self._dirty:
+            return True
+        tmp_path = None
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=2)
+            payload = dumps(self.config)
+            
+            # Write to a temp file next to the config and swap it in atomically
+            config_dir = os.path.dirname(os.path.abspath(self.config_file))
+            with tempfile.NamedTemporaryFile('wb', dir=config_dir, prefix='.app_config.',
+                                             suffix='.tmp', delete=False) as f:
+                tmp_path = f.name
+                f.write(payload)
+                if self.FSYNC:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.config_file)
+            tmp_path = None
+            self._dirty = False
             return True
         except Exception as e:
             self.logger.error(f"Error saving config: {e}")
             return False
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
     
     def get_mistral_api_key(self) -> Optional[str]:
         """Get Mistral API key"""
@@ -38,8 +75,7 @@ class ConfigManager:
     
     def set_mistral_api_key(self, api_key: str) -> bool:
         """Set Mistral API key"""
-        self.config['mistral_api_key'] = api_key
-        return self.save_config()
+        return self._set('mistral_api_key', api_key)
     
     def get_setting(self, key: str, default: Any = None) -> Any:
         """Get a setting value"""
@@ -47,8 +83,15 @@ class ConfigManager:
     
     def set_setting(self, key: str, value: Any) -> bool:
         """Set a setting value"""
+        return self._set(key, value)
+    
+    def _set(self, key: str, value: Any, flush: bool = True) -> bool:
+        """Update a value in memory, writing to file only when flush is set"""
         self.config[key] = value
-        return self.save_config()
+        self._dirty = True
+        if flush:
+            return self.save_config()
+        return True
     
     def get_mistral_settings(self) -> Dict[str, Any]:
         """Get all Mistral-related settings"""
@@ -60,18 +103,24 @@ class ConfigManager:
     
     def update_mistral_settings(self, settings: Dict[str, Any]) -> bool:
         """Update Mistral settings"""
-        success = True
+        updates = {}
         
         if 'mistral_api_key' in settings and settings['mistral_api_key']:
-            success &= self.set_mistral_api_key(settings['mistral_api_key'])
+            updates['mistral_api_key'] = settings['mistral_api_key']
         
         if 'enable_mistral_ocr' in settings:
-            success &= self.set_setting('enable_mistral_ocr', settings['enable_mistral_ocr'])
+            updates['enable_mistral_ocr'] = settings['enable_mistral_ocr']
         
         if 'enable_field_validation' in settings:
-            success &= self.set_setting('enable_field_validation', settings['enable_field_validation'])
+            updates['enable_field_validation'] = settings['enable_field_validation']
         
-        return success
+        # Only touch values that actually changed
+        for key, value in updates.items():
+            if key not in self.config or self.config[key] != value:
+                self._set(key, value, flush=False)
+        
+        # Write all changes to file in one go (a no-op when nothing changed)
+        return self.save_config()
 
 # Global config manager instance
 config_manager = ConfigManager()
\ No newline at end of file
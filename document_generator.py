@@ -1,5 +1,11 @@
 import os
-import json
+import hashlib
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
@@ -8,29 +14,159 @@ from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from flask import current_app
+from json_utils import dumps
+
+# Superseded previews are only deleted once unused for this many seconds, so a request
+# still sending one (possibly in another worker process) never finds it gone
+PREVIEW_STALE_SECONDS = 300
+
+# Table styles are never modified by Table.setStyle, so one instance serves every document
+PRODUCT_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+])
+
+TEST_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+])
+
+FOOTER_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+])
+
+COMPOSITION_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+])
+
+SPEC_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+# Words marking a line of supplier MSDS content as a section header
+MSDS_SECTION_KEYWORDS = ('section', 'hazard', 'composition', 'first aid', 'fire', 'storage', 'handling',
+                         'exposure', 'physical', 'stability', 'toxicological', 'ecological', 'disposal',
+                         'transport', 'regulatory')
+
+# Fixed MSDS text that doesn't depend on the extracted data
+MSDS_HAZARD_LINES = (
+    "<b>Classification of the substance or mixture:</b>",
+    "The product has been classified according to the legislation in force.",
+    "Classification according to Regulation (EC) No 1272/2008 as amended.",
+    "<b>Label Elements:</b> Not applicable.",
+    "<b>Signal Words:</b> Not applicable",
+    "<b>Hazard Statement(s):</b> Not applicable",
+    "<b>Precautionary Statements:</b> Not applicable",
+)
+
+MSDS_COMPOSITION_LINES = (
+    "<b>Substances:</b> This product is a mixture.",
+    "<b>Description:</b> Mixture of the substances listed below with non hazardous addition.",
+)
+
+MSDS_STATIC_SECTIONS = (
+    ("4. First aid measures", "Supply fresh air; consult doctor in case of complaint. In case of skin contact, flush with plenty of water."),
+    ("5. Firefighting measures", "Suitable extinguishing media: foam, carbon dioxide, dry powder, water spray."),
+    ("6. Accidental release measures", "Ensure adequate ventilation. Avoid contact with skin and eyes."),
+    ("7. Handling and storage", "Store in a cool, dry and well-ventilated place away from strong oxidants."),
+    ("8. Exposure controls", "Use appropriate personal protective equipment."),
+)
+
+# Fixed TDS text and the specifications used when none were extracted
+TDS_DESCRIPTION = (
+    "COSCARE-H ACID is a sodium salt form of Hyaluronic Acid. Hyaluronic Acid is a natural "
+    "biomolecule widely found in skin and other tissues. It has excellent moisturizing effect and is "
+    "internationally known the ideal Natural Moisturizing Factor (NMF). It is a substance with good "
+    "moisturizing properties for cosmetics found in nature."
+)
+
+TDS_APPLICATIONS = (
+    "➢ Moisturizing agent, anti-wrinkle agent, film former, skin conditioner.",
+    "➢ Used in moisturizing products, anti-ageing products, skin soothing and healing products, etc.",
+    "➢ Suitable for lotion gel, essence, emulsion and cream etc.",
+)
+
+TDS_DEFAULT_SPECIFICATIONS = MappingProxyType({
+    'Appearance': 'White solid powder',
+    'Molecular weight': '(0.5 – 1.8) x 10⁶',
+    'Sodium hyaluronate content': '≥ 95%',
+    'Protein': '≤ 0.1%',
+    'Loss on drying': '≤ 10%',
+    'pH': '5.0-8.5',
+    'Staphylococcus Aureus': 'Negative',
+    'Pseudomonas Aeruginosa': 'Negative',
+    'Heavy metal': '≤20 ppm',
+    'Total Bacteria': '< 100 CFU/g',
+    'Yeast and molds': '< 50 CFU/g',
+})
+
+# DocumentSet columns and extracted_data keys that never appear in the generated documents
+UNRENDERED_COLUMNS = frozenset({'extracted_data', 'status', 'processing_error', 'generated_coa_path',
+                                'generated_msds_path', 'generated_tds_path'})
+UNRENDERED_KEYS = frozenset({'status', 'approved_at', 'signed_at', 'signature', 'generated_digest'})
 
 class DocumentGenerator:
     def __init__(self):
         self.company_name = "Nano Tech Chemical Brothers Pvt. Ltd."
         self.company_address = "Vill. Mangarh, P.O. Kohara, Chandigarh Road Ludhiana-141112 INDIA"
         self.company_phone = "9041060304"
+        self._styles = None
         
     def generate_documents(self, doc_set, extracted_data):
         """Generate all three documents and return file paths"""
         generated_files = {}
+        generators = [
+            ('coa', self.generate_coa),
+            ('msds', self.generate_msds),
+            ('tds', self.generate_tds),
+        ]
+        
+        # Resolve names and dates once so all three documents agree
+        product_name, safe_name = self._product_names(doc_set, extracted_data)
+        today = datetime.now()
+        
+        # Flask context locals don't cross threads, so each worker pushes its own app context
+        app = current_app._get_current_object()
+        self.get_styles()
+        
+        def run_in_context(generate):
+            with app.app_context():
+                return generate(doc_set, extracted_data, product_name=product_name,
+                                safe_name=safe_name, today=today)
         
         try:
-            # Generate COA
-            coa_path = self.generate_coa(doc_set, extracted_data)
-            generated_files['coa'] = coa_path
-            
-            # Generate MSDS
-            msds_path = self.generate_msds(doc_set, extracted_data)
-            generated_files['msds'] = msds_path
-            
-            # Generate TDS
-            tds_path = self.generate_tds(doc_set, extracted_data)
-            generated_files['tds'] = tds_path
+            # The three documents are independent, so build them concurrently
+            with ThreadPoolExecutor(max_workers=len(generators)) as executor:
+                futures = {
+                    doc_type: executor.submit(run_in_context, generate)
+                    for doc_type, generate in generators
+                }
+                for doc_type, future in futures.items():
+                    generated_files[doc_type] = future.result()
             
         except Exception as e:
             current_app.logger.error(f"Error generating documents: {str(e)}")
@@ -58,8 +194,24 @@ class DocumentGenerator:
             # Fallback to company product name if no extraction
             return doc_set.company_product_name
 
+    def _product_names(self, doc_set, extracted_data):
+        """Get the display product name and its filename-safe form"""
+        product_name = self.get_product_name(doc_set, extracted_data)
+        safe_name = product_name.replace(' ', '_').replace('(', '').replace(')', '')
+        return product_name, safe_name
+    
+    def _label_block(self, rows, styles):
+        """Render label/value rows as one paragraph so the markup is parsed only once"""
+        return Paragraph("<br/>".join(f"<b>{label}</b> {value}" for label, value in rows), styles['Normal'])
+    
     def get_styles(self):
-        """Get custom styles for documents"""
+        """Get custom styles for documents, building the stylesheet only once"""
+        if self._styles is None:
+            self._styles = self._build_styles()
+        return self._styles
+    
+    def _build_styles(self):
+        """Build the sample stylesheet with the custom document styles added"""
         styles = getSampleStyleSheet()
         
         # Company header style
@@ -94,13 +246,22 @@ class DocumentGenerator:
         
         return styles
     
-    def generate_coa(self, doc_set, extracted_data):
+    def _build_pdf(self, filepath, story):
+        """Render the story in memory and write the finished PDF with a single write"""
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4)
+        doc.build(story)
+        Path(filepath).write_bytes(buffer.getvalue())
+    
+    def generate_coa(self, doc_set, extracted_data, product_name=None, safe_name=None, today=None):
         """Generate Certificate of Analysis"""
-        product_name = self.get_product_name(doc_set, extracted_data)
-        filename = f"{doc_set.id}_COA_{product_name.replace(' ', '_').replace('(', '').replace(')', '')}.pdf"
+        if product_name is None:
+            product_name, safe_name = self._product_names(doc_set, extracted_data)
+        filename = f"{doc_set.id}_COA_{safe_name}.pdf"
         filepath = os.path.join(current_app.config['GENERATED_FOLDER'], filename)
+        today = today or datetime.now()
+        today_str = today.strftime('%d-%m-%Y')
         
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
         styles = self.get_styles()
         story = []
         
@@ -118,19 +279,13 @@ class DocumentGenerator:
         product_data = [
             ['Product Name:', product_name],
             ['INCI Name:', extracted_data.get('inci_name', '')],
-            ['Batch Number:', self.generate_batch_number(doc_set)],
-            ['Manufacturing Date:', datetime.now().strftime('%d-%m-%Y')],
-            ['Expiry Date:', (datetime.now() + timedelta(days=730)).strftime('%d-%m-%Y')]
+            ['Batch Number:', self.generate_batch_number(doc_set, today)],
+            ['Manufacturing Date:', today_str],
+            ['Expiry Date:', (today + timedelta(days=730)).strftime('%d-%m-%Y')]
         ]
         
         product_table = Table(product_data, colWidths=[2*inch, 4*inch])
-        product_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-        ]))
+        product_table.setStyle(PRODUCT_TABLE_STYLE)
         
         story.append(product_table)
         story.append(Spacer(1, 30))
@@ -161,47 +316,34 @@ class DocumentGenerator:
             ])
         
         test_table = Table(test_data, colWidths=[2.5*inch, 2*inch, 1.5*inch])
-        test_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ]))
+        test_table.setStyle(TEST_TABLE_STYLE)
         
         story.append(test_table)
         story.append(Spacer(1, 40))
         
         # Footer
         footer_data = [
-            ['ISSUED DATE:', datetime.now().strftime('%d-%m-%Y')],
+            ['ISSUED DATE:', today_str],
             ['TEST RESULT:', 'PASS']
         ]
         
         footer_table = Table(footer_data, colWidths=[2*inch, 2*inch])
-        footer_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ]))
+        footer_table.setStyle(FOOTER_TABLE_STYLE)
         
         story.append(footer_table)
         story.append(Spacer(1, 40))
         story.append(Paragraph(self.company_name, styles['Normal']))
         
-        doc.build(story)
+        self._build_pdf(filepath, story)
         return filepath
     
-    def generate_msds(self, doc_set, extracted_data):
+    def generate_msds(self, doc_set, extracted_data, product_name=None, safe_name=None, today=None):
         """Generate Material Safety Data Sheet"""
-        product_name = self.get_product_name(doc_set, extracted_data)
-        filename = f"{doc_set.id}_MSDS_{product_name.replace(' ', '_').replace('(', '').replace(')', '')}.pdf"
+        if product_name is None:
+            product_name, safe_name = self._product_names(doc_set, extracted_data)
+        filename = f"{doc_set.id}_MSDS_{safe_name}.pdf"
         filepath = os.path.join(current_app.config['GENERATED_FOLDER'], filename)
         
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
         styles = self.get_styles()
         story = []
         
@@ -226,8 +368,7 @@ class DocumentGenerator:
             ['Mobile No.:', self.company_phone]
         ]
         
-        for item in identification_data:
-            story.append(Paragraph(f"<b>{item[0]}</b> {item[1]}", styles['Normal']))
+        story.append(self._label_block(identification_data, styles))
         
         story.append(Spacer(1, 15))
         
@@ -253,7 +394,8 @@ class DocumentGenerator:
                             continue
                             
                         # Check if this looks like a section header
-                        if any(keyword in para.lower() for keyword in ['section', 'hazard', 'composition', 'first aid', 'fire', 'storage', 'handling', 'exposure', 'physical', 'stability', 'toxicological', 'ecological', 'disposal', 'transport', 'regulatory']):
+                        para_lower = para.lower()
+                        if any(keyword in para_lower for keyword in MSDS_SECTION_KEYWORDS):
                             if not para.startswith(f'{section_num}.'):
                                 para = f"{section_num}. {para}"
                                 section_num += 1
@@ -267,19 +409,12 @@ class DocumentGenerator:
         else:
             # Fallback to basic MSDS template if no comprehensive content available
             story.append(Paragraph("2. Hazards Identification:", styles['SectionHeader']))
-            story.append(Paragraph("<b>Classification of the substance or mixture:</b>", styles['Normal']))
-            story.append(Paragraph("The product has been classified according to the legislation in force.", styles['Normal']))
-            story.append(Paragraph("Classification according to Regulation (EC) No 1272/2008 as amended.", styles['Normal']))
-            story.append(Paragraph("<b>Label Elements:</b> Not applicable.", styles['Normal']))
-            story.append(Paragraph("<b>Signal Words:</b> Not applicable", styles['Normal']))
-            story.append(Paragraph("<b>Hazard Statement(s):</b> Not applicable", styles['Normal']))
-            story.append(Paragraph("<b>Precautionary Statements:</b> Not applicable", styles['Normal']))
+            story.extend(Paragraph(line, styles['Normal']) for line in MSDS_HAZARD_LINES)
             story.append(Spacer(1, 15))
         
         # Section 3: Composition
         story.append(Paragraph("3. Composition/Information on Ingredients:", styles['SectionHeader']))
-        story.append(Paragraph("<b>Substances:</b> This product is a mixture.", styles['Normal']))
-        story.append(Paragraph("<b>Description:</b> Mixture of the substances listed below with non hazardous addition.", styles['Normal']))
+        story.extend(Paragraph(line, styles['Normal']) for line in MSDS_COMPOSITION_LINES)
         
         composition_data = [
             ['Product Name', 'CAS No', 'EINECS No.', 'Concentration'],
@@ -289,44 +424,32 @@ class DocumentGenerator:
         ]
         
         comp_table = Table(composition_data, colWidths=[2*inch, 1.5*inch, 1.5*inch, 1*inch])
-        comp_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ]))
+        comp_table.setStyle(COMPOSITION_TABLE_STYLE)
         
         story.append(comp_table)
         story.append(Spacer(1, 15))
         
         # Add more sections as needed (abbreviated for space)
-        sections = [
-            ("4. First aid measures", "Supply fresh air; consult doctor in case of complaint. In case of skin contact, flush with plenty of water."),
-            ("5. Firefighting measures", "Suitable extinguishing media: foam, carbon dioxide, dry powder, water spray."),
-            ("6. Accidental release measures", "Ensure adequate ventilation. Avoid contact with skin and eyes."),
-            ("7. Handling and storage", "Store in a cool, dry and well-ventilated place away from strong oxidants."),
-            ("8. Exposure controls", "Use appropriate personal protective equipment."),
-            ("9. Physical and chemical properties", f"Form: Powder, Colour: White, pH: {extracted_data.get('safety_data', {}).get('ph', '5.0-8.5')}"),
-        ]
-        
-        for section_title, section_content in sections:
+        for section_title, section_content in MSDS_STATIC_SECTIONS:
             story.append(Paragraph(section_title, styles['SectionHeader']))
             story.append(Paragraph(section_content, styles['Normal']))
             story.append(Spacer(1, 10))
         
-        doc.build(story)
+        # Section 9 depends on the extracted pH
+        story.append(Paragraph("9. Physical and chemical properties", styles['SectionHeader']))
+        story.append(Paragraph(f"Form: Powder, Colour: White, pH: {extracted_data.get('safety_data', {}).get('ph', '5.0-8.5')}", styles['Normal']))
+        story.append(Spacer(1, 10))
+        
+        self._build_pdf(filepath, story)
         return filepath
     
-    def generate_tds(self, doc_set, extracted_data):
+    def generate_tds(self, doc_set, extracted_data, product_name=None, safe_name=None, today=None):
         """Generate Technical Data Sheet"""
-        product_name = self.get_product_name(doc_set, extracted_data)
-        filename = f"{doc_set.id}_TDS_{product_name.replace(' ', '_').replace('(', '').replace(')', '')}.pdf"
+        if product_name is None:
+            product_name, safe_name = self._product_names(doc_set, extracted_data)
+        filename = f"{doc_set.id}_TDS_{safe_name}.pdf"
         filepath = os.path.join(current_app.config['GENERATED_FOLDER'], filename)
         
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
         styles = self.get_styles()
         story = []
         
@@ -341,11 +464,7 @@ class DocumentGenerator:
         
         # Description
         story.append(Paragraph("<b>Description:</b>", styles['SectionHeader']))
-        description = """COSCARE-H ACID is a sodium salt form of Hyaluronic Acid. Hyaluronic Acid is a natural 
-        biomolecule widely found in skin and other tissues. It has excellent moisturizing effect and is 
-        internationally known the ideal Natural Moisturizing Factor (NMF). It is a substance with good 
-        moisturizing properties for cosmetics found in nature."""
-        story.append(Paragraph(description, styles['Normal']))
+        story.append(Paragraph(TDS_DESCRIPTION, styles['Normal']))
         story.append(Spacer(1, 15))
         
         # Basic information
@@ -355,20 +474,13 @@ class DocumentGenerator:
             ['M.F.:', extracted_data.get('molecular_formula', '(C14H21NO11)n')]
         ]
         
-        for item in basic_info:
-            story.append(Paragraph(f"<b>{item[0]}</b> {item[1]}", styles['Normal']))
+        story.append(self._label_block(basic_info, styles))
         
         story.append(Spacer(1, 15))
         
         # Application
         story.append(Paragraph("<b>Application:</b>", styles['SectionHeader']))
-        applications = [
-            "➢ Moisturizing agent, anti-wrinkle agent, film former, skin conditioner.",
-            "➢ Used in moisturizing products, anti-ageing products, skin soothing and healing products, etc.",
-            "➢ Suitable for lotion gel, essence, emulsion and cream etc."
-        ]
-        
-        for app in applications:
+        for app in TDS_APPLICATIONS:
             story.append(Paragraph(app, styles['Normal']))
         
         story.append(Spacer(1, 20))
@@ -379,36 +491,13 @@ class DocumentGenerator:
         spec_data = [['Test Items', 'Specifications']]
         
         # Use extracted specifications or defaults
-        specifications = extracted_data.get('specifications', {})
-        if not specifications:
-            specifications = {
-                'Appearance': 'White solid powder',
-                'Molecular weight': '(0.5 – 1.8) x 10⁶',
-                'Sodium hyaluronate content': '≥ 95%',
-                'Protein': '≤ 0.1%',
-                'Loss on drying': '≤ 10%',
-                'pH': '5.0-8.5',
-                'Staphylococcus Aureus': 'Negative',
-                'Pseudomonas Aeruginosa': 'Negative',
-                'Heavy metal': '≤20 ppm',
-                'Total Bacteria': '< 100 CFU/g',
-                'Yeast and molds': '< 50 CFU/g'
-            }
+        specifications = extracted_data.get('specifications') or TDS_DEFAULT_SPECIFICATIONS
         
         for test_item, spec in specifications.items():
             spec_data.append([test_item, spec])
         
         spec_table = Table(spec_data, colWidths=[3*inch, 2.5*inch])
-        spec_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ]))
+        spec_table.setStyle(SPEC_TABLE_STYLE)
         
         story.append(spec_table)
         story.append(Spacer(1, 20))
@@ -427,37 +516,70 @@ class DocumentGenerator:
             story.append(Paragraph(value, styles['Normal']))
             story.append(Spacer(1, 10))
         
-        doc.build(story)
+        self._build_pdf(filepath, story)
         return filepath
     
-    def generate_batch_number(self, doc_set):
+    def generate_batch_number(self, doc_set, today=None):
         """Generate a batch number for the company"""
         prefix = "NTCB"
-        date_part = datetime.now().strftime("%y%m%d")
+        date_part = (today or datetime.now()).strftime("%y%m%d")
         suffix = f"{doc_set.id:02d}K1"
         return f"{prefix}/{date_part}{suffix}"
     
     def generate_preview_coa(self, doc_set, extracted_data):
         """Generate preview COA document"""
-        filename = f"preview_{doc_set.id}_COA.pdf"
-        filepath = os.path.join(current_app.config['GENERATED_FOLDER'], filename)
-        return self.generate_coa_to_path(doc_set, extracted_data, filepath)
+        return self._preview(doc_set, extracted_data, 'COA', self.generate_coa_to_path)
     
     def generate_preview_msds(self, doc_set, extracted_data):
         """Generate preview MSDS document"""
-        filename = f"preview_{doc_set.id}_MSDS.pdf"
-        filepath = os.path.join(current_app.config['GENERATED_FOLDER'], filename)
-        return self.generate_msds_to_path(doc_set, extracted_data, filepath)
+        return self._preview(doc_set, extracted_data, 'MSDS', self.generate_msds_to_path)
     
     def generate_preview_tds(self, doc_set, extracted_data):
         """Generate preview TDS document"""
-        filename = f"preview_{doc_set.id}_TDS.pdf"
-        filepath = os.path.join(current_app.config['GENERATED_FOLDER'], filename)
-        return self.generate_tds_to_path(doc_set, extracted_data, filepath)
+        return self._preview(doc_set, extracted_data, 'TDS', self.generate_tds_to_path)
+    
+    def input_digest(self, doc_set, extracted_data):
+        """Fingerprint everything the generated documents show: the document set, its data and today's date"""
+        columns = {column.name: getattr(doc_set, column.name) for column in doc_set.__table__.columns
+                   if column.name not in UNRENDERED_COLUMNS}
+        data = {key: value for key, value in extracted_data.items() if key not in UNRENDERED_KEYS}
+        inputs = [columns, data, datetime.now().strftime('%Y-%m-%d')]
+        return hashlib.sha256(dumps(inputs, sort_keys=True, default=str)).hexdigest()[:16]
+    
+    def _preview(self, doc_set, extracted_data, doc_type, generate_to_path):
+        """Return the preview PDF for the current data, rendering it only when its inputs changed"""
+        digest = self.input_digest(doc_set, extracted_data)
+        folder = current_app.config['GENERATED_FOLDER']
+        filepath = os.path.join(folder, f"preview_{doc_set.id}_{doc_type}_{digest}.pdf")
+        try:
+            # Mark the preview as in use so it isn't swept as stale
+            os.utime(filepath)
+            return filepath
+        except FileNotFoundError:
+            pass
+        
+        # Drop previews of older data nobody has asked for lately, then write the new one atomically
+        cutoff = time.time() - PREVIEW_STALE_SECONDS
+        for stale in Path(folder).glob(f"preview_{doc_set.id}_{doc_type}_*.pdf"):
+            try:
+                if stale.stat().st_mtime < cutoff:
+                    stale.unlink()
+            except FileNotFoundError:
+                pass
+        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+        os.close(fd)
+        try:
+            generate_to_path(doc_set, extracted_data, tmp_path)
+            os.replace(tmp_path, filepath)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return filepath
     
     def generate_coa_to_path(self, doc_set, extracted_data, filepath):
         """Generate COA to specific path"""
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
+        today = datetime.now()
+        today_str = today.strftime('%d-%m-%Y')
         styles = self.get_styles()
         story = []
         
@@ -475,19 +597,13 @@ class DocumentGenerator:
         product_data = [
             ['Product Name:', doc_set.company_product_name],
             ['INCI Name:', extracted_data.get('inci_name', '')],
-            ['Batch Number:', self.generate_batch_number(doc_set)],
-            ['Manufacturing Date:', datetime.now().strftime('%d-%m-%Y')],
-            ['Expiry Date:', (datetime.now() + timedelta(days=730)).strftime('%d-%m-%Y')]
+            ['Batch Number:', self.generate_batch_number(doc_set, today)],
+            ['Manufacturing Date:', today_str],
+            ['Expiry Date:', (today + timedelta(days=730)).strftime('%d-%m-%Y')]
         ]
         
         product_table = Table(product_data, colWidths=[2*inch, 4*inch])
-        product_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-        ]))
+        product_table.setStyle(PRODUCT_TABLE_STYLE)
         
         story.append(product_table)
         story.append(Spacer(1, 30))
@@ -518,44 +634,30 @@ class DocumentGenerator:
             ])
         
         test_table = Table(test_data, colWidths=[2.5*inch, 2*inch, 1.5*inch])
-        test_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ]))
+        test_table.setStyle(TEST_TABLE_STYLE)
         
         story.append(test_table)
         story.append(Spacer(1, 40))
         
         # Footer
         footer_data = [
-            ['ISSUED DATE:', datetime.now().strftime('%d-%m-%Y')],
+            ['ISSUED DATE:', today_str],
             ['TEST RESULT:', 'PASS']
         ]
         
         footer_table = Table(footer_data, colWidths=[2*inch, 2*inch])
-        footer_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ]))
+        footer_table.setStyle(FOOTER_TABLE_STYLE)
         
         story.append(footer_table)
         story.append(Spacer(1, 40))
         story.append(Paragraph(self.company_name, styles['Normal']))
         
-        doc.build(story)
+        self._build_pdf(filepath, story)
         return filepath
     
     def generate_msds_to_path(self, doc_set, extracted_data, filepath):
         """Generate MSDS to specific path"""
         # Simplified MSDS generation for preview
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
         styles = self.get_styles()
         story = []
         
@@ -577,8 +679,7 @@ class DocumentGenerator:
             ['Company Name:', self.company_name],
         ]
         
-        for item in identification_data:
-            story.append(Paragraph(f"<b>{item[0]}</b> {item[1]}", styles['Normal']))
+        story.append(self._label_block(identification_data, styles))
         
         story.append(Spacer(1, 15))
         
@@ -593,13 +694,12 @@ class DocumentGenerator:
             story.append(Paragraph(section_content, styles['Normal']))
             story.append(Spacer(1, 10))
         
-        doc.build(story)
+        self._build_pdf(filepath, story)
         return filepath
     
     def generate_tds_to_path(self, doc_set, extracted_data, filepath):
         """Generate TDS to specific path"""
         # Simplified TDS generation for preview
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
         styles = self.get_styles()
         story = []
         
@@ -625,8 +725,7 @@ class DocumentGenerator:
             ['M.F.:', extracted_data.get('molecular_formula', '(C14H21NO11)n')]
         ]
         
-        for item in basic_info:
-            story.append(Paragraph(f"<b>{item[0]}</b> {item[1]}", styles['Normal']))
+        story.append(self._label_block(basic_info, styles))
         
-        doc.build(story)
+        self._build_pdf(filepath, story)
         return filepath
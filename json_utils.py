@@ -0,0 +1,36 @@
+"""
+JSON encoding shared by the app, preferring orjson when installed
+"""
+import json
+
+# Optional faster JSON serializer
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def dumps(obj, indent: bool = False, sort_keys: bool = False, default=None) -> bytes:
+    """Serialize obj as UTF-8 JSON bytes, compact unless indent is set
+    
+    Non-string dict keys are converted to strings. When default is given it also receives
+    dates and datetimes, as with the json module.
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if default is not None:
+            option |= orjson.OPT_PASSTHROUGH_DATETIME
+        return orjson.dumps(obj, default=default, option=option)
+    return json.dumps(obj, indent=2 if indent else None, separators=None if indent else (',', ':'),
+                      sort_keys=sort_keys, default=default, ensure_ascii=False).encode()
+
+def loads(data):
+    """Parse JSON from a str or bytes-like buffer"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    # json accepts bytes but not other buffers such as memoryview
+    return json.loads(data if isinstance(data, (str, bytes)) else bytes(data))
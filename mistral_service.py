@@ -3,12 +3,17 @@ Mistral AI integration for OCR enhancement and field validation
 """
 import os
 import logging
+import weakref
 import requests
 import base64
 import json
 from typing import Dict, Any, Optional, List
 from PIL import Image
 import io
+from json_utils import dumps, loads
+
+# Longest image edge sent to the vision model; larger scans don't improve OCR
+MAX_IMAGE_EDGE = 2048
 
 class MistralService:
     def __init__(self):
@@ -27,6 +32,23 @@ class MistralService:
             except:
                 pass
         
+        # Reuse one pooled connection for all API calls made by this service
+        self._session = requests.Session()
+        self._session.headers.update({"Content-Type": "application/json"})
+        if self.api_key:
+            self._session.headers.update({"Authorization": f"Bearer {self.api_key}"})
+        self._finalizer = weakref.finalize(self, self._session.close)
+    
+    def close(self):
+        """Release pooled connections"""
+        self._finalizer()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        
     def test_connection(self, api_key: str = None) -> Dict[str, Any]:
         """Test Mistral API connection"""
         test_key = api_key or self.api_key
@@ -40,7 +62,7 @@ class MistralService:
         }
         
         try:
-            response = requests.get(f"{self.base_url}/models", headers=headers, timeout=10)
+            response = self._session.get(f"{self.base_url}/models", headers=headers, timeout=10)
             if response.status_code == 200:
                 models = response.json()
                 return {
@@ -57,6 +79,15 @@ class MistralService:
         except requests.exceptions.RequestException as e:
             return {"success": False, "error": f"Connection failed: {str(e)}"}
     
+    def _prepare_image(self, image_path: str) -> bytes:
+        """Downscale the image and re-encode it as JPEG to keep the upload small"""
+        with Image.open(image_path) as img:
+            if max(img.size) > MAX_IMAGE_EDGE:
+                img.thumbnail((MAX_IMAGE_EDGE, MAX_IMAGE_EDGE), Image.LANCZOS)
+            buffer = io.BytesIO()
+            img.convert('RGB').save(buffer, 'JPEG', quality=85, optimize=True)
+        return buffer.getvalue()
+    
     def enhance_ocr_extraction(self, image_path: str, existing_text: str = "") -> str:
         """Use Mistral vision model to enhance OCR text extraction"""
         if not self.api_key:
@@ -64,9 +95,8 @@ class MistralService:
             return existing_text
             
         try:
-            # Convert image to base64
-            with open(image_path, 'rb') as img_file:
-                img_base64 = base64.b64encode(img_file.read()).decode()
+            # Build the data URL directly from the encoded JPEG, keeping only one text copy
+            image_url = "data:image/jpeg;base64," + base64.b64encode(self._prepare_image(image_path)).decode('ascii')
             
             prompt = """Please extract ALL text content from this document image with high accuracy. 
             Pay special attention to:
@@ -79,11 +109,6 @@ class MistralService:
             
             Return the extracted text exactly as it appears, maintaining the original structure and formatting."""
             
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
             payload = {
                 "model": "pixtral-12b-2409",
                 "messages": [
@@ -97,7 +122,7 @@ class MistralService:
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:image/jpeg;base64,{img_base64}"
+                                    "url": image_url
                                 }
                             }
                         ]
@@ -106,8 +131,11 @@ class MistralService:
                 "max_tokens": 4000
             }
             
-            response = requests.post(f"{self.base_url}/chat/completions", 
-                                   headers=headers, json=payload, timeout=8)
+            # Serialize once to bytes so requests sends the body without re-encoding it
+            body = dumps(payload)
+            del payload, image_url
+            response = self._session.post(f"{self.base_url}/chat/completions", 
+                                          data=body, timeout=8)
             
             if response.status_code == 200:
                 result = response.json()
@@ -134,7 +162,7 @@ class MistralService:
             Look for common OCR errors and inconsistencies:
 
             Extracted Data:
-            {json.dumps(extracted_data, indent=2)}
+            {dumps(extracted_data, indent=True).decode()}
 
             Please check and correct:
             1. Product names - ensure proper chemical nomenclature
@@ -150,11 +178,6 @@ class MistralService:
             Add a "validation_notes" field explaining any corrections made.
             """
             
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
             payload = {
                 "model": "mistral-large-latest",
                 "messages": [
@@ -167,8 +190,8 @@ class MistralService:
                 "temperature": 0.1
             }
             
-            response = requests.post(f"{self.base_url}/chat/completions", 
-                                   headers=headers, json=payload, timeout=8)
+            response = self._session.post(f"{self.base_url}/chat/completions", 
+                                          json=payload, timeout=8)
             
             if response.status_code == 200:
                 result = response.json()
@@ -184,7 +207,7 @@ class MistralService:
                     else:
                         json_str = corrected_text.strip()
                     
-                    corrected_data = json.loads(json_str)
+                    corrected_data = loads(json_str)
                     self.logger.info("Mistral field validation completed successfully")
                     return corrected_data
                     
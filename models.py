@@ -1,5 +1,6 @@
 from app import db
 from datetime import datetime
+from sqlalchemy.dialects.postgresql import JSONB
 
 class DocumentSet(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -23,8 +24,25 @@ class DocumentSet(db.Model):
     generated_msds_path = db.Column(db.String(500))
     generated_tds_path = db.Column(db.String(500))
     
+    # Background processing state: 'pending', 'done' or 'error' (NULL on older rows, which are done)
+    status = db.Column(db.String(20), default='done')
+    processing_error = db.Column(db.Text)
+    processing_started_at = db.Column(db.DateTime)
+    
     # Extracted data (JSON field)
-    extracted_data = db.Column(db.Text)  # Will store JSON string
+    extracted_data = db.Column(db.JSON().with_variant(JSONB(), 'postgresql'))  # Stored decoded as JSONB on PostgreSQL
+    
+    __table_args__ = (
+        db.Index('ix_ds_cas', 'cas_number'),
+        db.Index('ix_ds_batch', 'batch_number'),
+        db.Index('ix_ds_created_at', 'created_at'),  # Recent/processed lists order by this
+    )
+    
+    def test_summary(self):
+        """Return the test result rows as plain tuples, without loading TestResult objects"""
+        return db.session.query(
+            TestResult.test_item, TestResult.specification, TestResult.result, TestResult.document_type
+        ).filter(TestResult.document_set_id == self.id).order_by(TestResult.id).all()
     
     def __repr__(self):
         return f'<DocumentSet {self.company_product_name}>'
@@ -38,3 +56,7 @@ class TestResult(db.Model):
     document_type = db.Column(db.String(10))  # COA, MSDS, TDS
     
     document_set = db.relationship('DocumentSet', backref=db.backref('test_results', lazy=True))
+    
+    __table_args__ = (
+        db.Index('ix_tr_docset', 'document_set_id', 'document_type'),
+    )
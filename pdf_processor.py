@@ -1,14 +1,26 @@
 import pdfplumber
 import re
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 import tempfile
 import os
+import hashlib
+import functools
+import threading
+import mmap
+import contextlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from json_utils import dumps, loads
+
+logger = logging.getLogger(__name__)
 
 # Optional imports for OCR functionality
 try:
     import pytesseract
     from pdf2image import convert_from_path
+    from PIL import Image
     import numpy as np
     # Try importing cv2 with fallback
     try:
@@ -18,14 +30,362 @@ try:
         CV2_AVAILABLE = False
         print("OpenCV not available, using basic image processing")
     OCR_AVAILABLE = True
+    # Pages are OCR'd in parallel; tesseract's own OpenMP threading scales poorly on top of that
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
 except ImportError as e:
     OCR_AVAILABLE = False
     print(f"OCR dependencies not available: {e}")
     print("PDF text extraction will use pdfplumber only")
 
+
+# Optional fast text layer extraction, see PDFProcessor.extract_text_layer
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+# PDFium is not thread-safe, even across separate documents
+PDFIUM_LOCK = threading.Lock()
+
+# tesserocr calls the tesseract library in-process instead of spawning it per page
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+# One tesseract API per OCR thread; an API instance must not be shared between threads
+TESSEROCR_LOCAL = threading.local()
+
+def _tesserocr_api():
+    """Return this thread's tesseract API, loading the language data on first use"""
+    api = getattr(TESSEROCR_LOCAL, 'api', None)
+    if api is None:
+        try:
+            api = tesserocr.PyTessBaseAPI(lang='eng')
+        except RuntimeError:
+            api = tesserocr.PyTessBaseAPI()
+        TESSEROCR_LOCAL.api = api
+    return api
+
+# PDFs above this size are memory-mapped for pdfplumber instead of read through a file buffer
+PDF_MMAP_THRESHOLD = 10 * 1024 * 1024
+
+@contextlib.contextmanager
+def _open_pdf(file_path, pages=None):
+    """Open a PDF with pdfplumber, memory-mapping large files"""
+    if os.path.getsize(file_path) <= PDF_MMAP_THRESHOLD:
+        with pdfplumber.open(file_path, pages=pages) as pdf:
+            yield pdf
+        return
+    # mmap is file-like itself; wrapping it in BytesIO would copy the whole file
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with pdfplumber.open(mm, pages=pages) as pdf:
+            yield pdf
+
+# Per-thread scratch images reused across the pages an OCR thread preprocesses
+OCR_BUFFERS = threading.local()
+
+def _ocr_buffer(name, shape):
+    """Return this thread's reusable uint8 image buffer for one preprocessing step"""
+    buffers = OCR_BUFFERS.__dict__.setdefault('buffers', {})
+    buffer = buffers.get((name, shape))
+    if buffer is None:
+        buffer = buffers[(name, shape)] = np.empty(shape, dtype=np.uint8)
+    return buffer
+
+# Escapes and group names, which must keep their case when a pattern is lowercased
+PATTERN_VERBATIM_RE = re.compile(r'\\N\{[^}]*\}|\\.|\(\?P[<=][^>)]*[>)]', re.DOTALL)
+
+def _lower_pattern(pattern):
+    """Lowercase the literal text of a regex, leaving escapes such as \\S or \\Z alone"""
+    parts = []
+    position = 0
+    for verbatim in PATTERN_VERBATIM_RE.finditer(pattern):
+        parts.append(pattern[position:verbatim.start()].lower())
+        parts.append(verbatim.group())
+        position = verbatim.end()
+    parts.append(pattern[position:].lower())
+    return ''.join(parts)
+
+def _compile(pattern, flags):
+    """Compile a pattern; case-insensitive ones are lowercased to run against _fold(text)"""
+    if flags & re.IGNORECASE:
+        return re.compile(_lower_pattern(pattern), flags & ~re.IGNORECASE)
+    return re.compile(pattern, flags)
+
+def _compile_all(patterns, flags):
+    """Compile a list of regex patterns that share the same flags"""
+    return tuple(_compile(pattern, flags) for pattern in patterns)
+
+def _compile_line_search(patterns, flags):
+    """Compile patterns into one regex that matches from the start of any line containing one of them; patterns must not span lines"""
+    alternatives = '|'.join(f'(?:{pattern})' for pattern in patterns)
+    return _compile(f'^.*?(?:{alternatives})', flags | re.MULTILINE)
+
+# Characters re.IGNORECASE matches to ASCII letters that str.lower() leaves alone
+FOLD_EXTRA = str.maketrans('ſı', 'si')
+
+def _fold(text):
+    """Lowercase text for the extraction patterns, keeping every character at its position
+    
+    Matching literal labels against lowercased text is much cheaper than re.IGNORECASE.
+    """
+    folded = text.lower()
+    if len(folded) != len(text):
+        # A few characters (e.g. 'İ') lowercase to several; keep only the first
+        folded = ''.join(char.lower()[0] for char in text)
+    if 'ſ' in folded or 'ı' in folded:
+        # re.IGNORECASE also treats these as 's' and 'i'
+        folded = folded.translate(FOLD_EXTRA)
+    return folded
+
+def _captured(match, text):
+    """Return the first group of a match against _fold(text), taken from the original text"""
+    return text[match.start(1):match.end(1)]
+
+def _lines_from(text, start, count):
+    """Return up to count lines of text, beginning with the line that starts at start"""
+    lines = []
+    while len(lines) < count:
+        end = text.find('\n', start)
+        if end == -1:
+            lines.append(text[start:])
+            break
+        lines.append(text[start:end])
+        start = end + 1
+    return lines
+
+def _search_end(end_re, text):
+    """Return how far into text a match that must finish with end_re can reach"""
+    last = None
+    for last in end_re.finditer(text):
+        pass
+    # One extra character covers a terminator overlapping the last match (e.g. '\n\n\n')
+    return min(last.end() + 1, len(text)) if last else 0
+
+# Extraction results are cached on disk by file content; bump the version whenever
+# the extraction logic changes so stale entries are ignored
+PDF_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdf_cache')
+PDF_CACHE_VERSION = 2
+# Least recently used entries beyond this count, or unused for this many seconds, are removed
+PDF_CACHE_MAX_FILES = 500
+PDF_CACHE_MAX_AGE = 30 * 24 * 3600
+
+# Extracted texts kept in memory, keyed by file version, page limit and OCR source
+TEXT_CACHE_SIZE = 64
+TEXT_CACHE = OrderedDict()
+TEXT_CACHE_LOCK = threading.Lock()
+
+# Pages read for COA field extraction; the labelled fields sit in the first sections.
+# MSDS and TDS files are read in full, since their full text is kept for document generation
+# and sharing that one extraction is cheaper than reading the first pages separately.
+COA_MAX_PAGES = 3
+
+# Pages whose text layer has fewer characters than this are treated as scanned and OCR'd
+MIN_PAGE_TEXT = 10
+
+# Pages are OCR'd at OCR_DPI and re-rendered at OCR_RETRY_DPI only when
+# tesseract's mean word confidence falls below OCR_MIN_CONFIDENCE
+OCR_DPI = 200
+OCR_RETRY_DPI = 300
+OCR_MIN_CONFIDENCE = 60
+
+# Grayscale pages with a pixel standard deviation below this get contrast equalization
+OCR_CLAHE_MAX_STD = 40
+
+MULTI_SPACE_RE = re.compile(r'\s{2,}')
+WIDE_SPACE_RE = re.compile(r'\s{3,}')
+
+# Lowercase words marking table lines that are not test/specification rows
+COA_ROW_SKIP_WORDS = ('issued', 'page', 'date', 'signature', 'approved', 'tel:', 'email:', 'address')
+TDS_ROW_SKIP_WORDS = ('recommended', 'use', 'package', 'storage', 'shelf', 'product', 'tel:', 'email:',
+                      'address', 'website', 'web:', 'add:')
+MSDS_PRODUCT_REJECT_WORDS = ('section', 'identifier')
+MSDS_INCI_REJECT_WORDS = ('poly', 'according', 'required', 'disposal', 'none')
+
+# Extraction patterns, compiled once at import. Within each tuple the patterns are
+# tried in order and the first acceptable match wins. Single-line values are captured
+# with [^\n]+ so the engine runs straight to the line end instead of testing a lazy
+# group against an end-of-line alternation at every character.
+
+COA_PRODUCT_PATTERNS = _compile_all([
+    r'Product\s+Name\s*[:\-]?\s*([^\n]+)',
+    r'Product\s*[:\-]?\s*([^\n]+)',
+    r'Name\s*[:\-]?\s*([^\n]+)',
+    r'Chemical\s+Name\s*[:\-]?\s*([^\n]+)',
+    r'Trade\s+Name\s*[:\-]?\s*([^\n]+)',
+    r'产品名称\s*[:\-]?\s*([^\n]+)',  # Chinese
+], re.IGNORECASE | re.MULTILINE)
+
+COA_INCI_PATTERNS = _compile_all([
+    r'INCI\s+Name\s*[:\-]?\s*([^\n]+)',
+    r'INCI\s*[:\-]?\s*([^\n]+)',
+    r'国际化妆品原料命名\s*[:\-]?\s*([^\n]+)',  # Chinese INCI
+], re.IGNORECASE | re.MULTILINE)
+
+COA_BATCH_PATTERNS = _compile_all([
+    r'Batch\s+(?:No\.?|Number)\s*[:\-]?\s*([A-Z0-9\-]+)',
+    r'Lot\s+(?:No\.?|Number)\s*[:\-]?\s*([A-Z0-9\-]+)',
+    r'批号\s*[:\-]?\s*([A-Z0-9\-]+)',  # Chinese
+    r'Batch\s*[:\-]?\s*([A-Z0-9\-]+)',
+    r'Lot\s*[:\-]?\s*([A-Z0-9\-]+)',
+], re.IGNORECASE)
+
+COA_MFG_DATE_PATTERNS = _compile_all([
+    r'Manufacturing\s+Date\s*[:\-]?\s*([0-9\-\/\.]+)',
+    r'Mfg\.?\s+Date\s*[:\-]?\s*([0-9\-\/\.]+)',
+    r'生产日期\s*[:\-]?\s*([0-9\-\/\.]+)',  # Chinese
+], re.IGNORECASE)
+
+COA_EXPIRY_DATE_PATTERNS = _compile_all([
+    r'Expiry\s+Date\s*[:\-]?\s*([0-9\-\/\.]+)',
+    r'Exp\.?\s+Date\s*[:\-]?\s*([0-9\-\/\.]+)',
+    r'有效期\s*[:\-]?\s*([0-9\-\/\.]+)',  # Chinese
+], re.IGNORECASE)
+
+COA_TABLE_HEADER_RE = _compile_line_search([
+    r'Test[ \t]+Items?.*Specification.*Result',
+    r'Item.*Specification.*Result',
+    r'Parameter.*Specification.*Result',
+    r'Property.*Value',
+    r'检测项目.*规格.*结果',  # Chinese
+], re.IGNORECASE)
+
+MSDS_PRODUCT_PATTERNS = _compile_all([
+    r'Product\s*name\s*(.+?)(?:\n|CAS)',  # Stop at CAS or newline
+    r'Product\s+(?:name|identifier)\s*[:\-]?\s*(.+?)(?:\n|CAS)',
+    r'Productname\s*(.+?)(?:\n|CAS)',  # No space version
+    r'Chemical\s+Name\s*[:\-]?\s*([^\n]+)',
+], re.IGNORECASE | re.MULTILINE)
+
+MSDS_CAS_PATTERNS = _compile_all([
+    r'CAS\s*(?:No\.?|Number)?\s*[:\-]?\s*(\d{2,7}-\d{2}-\d)',
+    r'CAS-No\.\s*(\d{2,7}-\d{2}-\d)',
+    r'CAS编号\s*[:\-]?\s*(\d{2,7}-\d{2}-\d)',  # Chinese
+], re.IGNORECASE)
+
+MSDS_FORMULA_PATTERNS = _compile_all([
+    r'Molecular\s+formula\s*[:\-]?\s*[（(]?([A-Z0-9\(\)]+n?)[）)]?',
+    r'Formula\s*[:\-]?\s*[（(]?([A-Z0-9\(\)]+n?)[）)]?',
+    r'M\.F\.\s*[:\-]?\s*[（(]?([A-Z0-9\(\)]+n?)[）)]?',
+    r'分子式\s*[:\-]?\s*[（(]?([A-Z0-9\(\)]+n?)[）)]?',  # Chinese
+], re.IGNORECASE)
+
+MSDS_SUPPLIER_PATTERNS = _compile_all([
+    r'Manufacturer\s*[:\-]?\s*(.+?)(?:\n|Address)',
+    r'Company\s+Name\s*[:\-]?\s*([^\n]+)',
+    r'Supplier\s*[:\-]?\s*([^\n]+)',
+    r'制造商\s*[:\-]?\s*([^\n]+)',  # Chinese
+], re.IGNORECASE | re.MULTILINE)
+
+MSDS_INCI_PATTERNS = _compile_all([
+    r'INCI\s*(?:Name)?\s*[:\-]?\s*([^\n]+)',
+    r'Synonyms\s*[:\-]?\s*(.+?)(?:\n|Formula)',  # Sometimes INCI is in synonyms
+], re.IGNORECASE | re.MULTILINE)
+
+MSDS_PH_PATTERNS = _compile_all([
+    r'pH\s*(?:value)?\s*[:\-]?\s*([\d\.\-\~\s]+)',
+    r'pH值\s*[:\-]?\s*([\d\.\-\~\s]+)',  # Chinese
+], re.IGNORECASE)
+
+MSDS_APPEARANCE_PATTERNS = _compile_all([
+    r'Appearance\s*[:\-]?\s*([^\n]+)',
+    r'Physical\s+state\s*[:\-]?\s*([^\n]+)',
+    r'外观\s*[:\-]?\s*([^\n]+)',  # Chinese
+], re.IGNORECASE | re.MULTILINE)
+
+MSDS_SOLUBILITY_PATTERNS = _compile_all([
+    r'Solubility\s*(?:in\s+water)?\s*[:\-]?\s*([^\n]+)',
+    r'Water\s+solubility\s*[:\-]?\s*([^\n]+)',
+    r'溶解性\s*[:\-]?\s*([^\n]+)',  # Chinese
+], re.IGNORECASE | re.MULTILINE)
+
+TDS_PRODUCT_PATTERNS = _compile_all([
+    r'Product\s*name\s*([^\n]+)',
+    r'TDS\s+of\s+([^\n]+)',
+    r'产品名称\s*([^\n]+)',  # Chinese
+], re.IGNORECASE | re.MULTILINE)
+
+TDS_INCI_PATTERNS = _compile_all([
+    r'INCI\s*([^\n]+)',
+    r'INCI\s+Name\s*([^\n]+)',
+], re.IGNORECASE | re.MULTILINE)
+
+TDS_CAS_PATTERNS = _compile_all([
+    r'CAS\s*(\d{2,7}-\d{2}-\d)',
+], re.IGNORECASE)
+
+TDS_FORMULA_PATTERNS = _compile_all([
+    r'Molecularformula\s*[（(]?([A-Z0-9\(\)]+n?)[）)]?',
+    r'Molecular\s+formula\s*[（(]?([A-Z0-9\(\)]+n?)[）)]?',
+    r'Formula\s*[（(]?\s*([A-Z0-9H\(\)]{3,}n?)\s*[）)]?',  # More flexible pattern
+    r'[（(]\s*([C][H0-9N\(\)O]+n?)\s*[）)]',  # Pattern in parentheses starting with C
+], re.IGNORECASE)
+
+TDS_APPEARANCE_PATTERNS = _compile_all([
+    r'Appearance\s*([^\n]+)',
+    r'Physical\s+form\s*([^\n]+)',
+], re.IGNORECASE | re.MULTILINE)
+
+TDS_SPEC_HEADER_RE = _compile_line_search([
+    r'Specification',
+    r'Test[ \t]+Items?',
+    r'Parameter',
+    r'Property',
+    r'Analysis',
+], re.IGNORECASE)
+
+TDS_USE_LEVEL_PATTERNS = _compile_all([
+    r'Recommended\s+use\s+level\s*[:\-]?\s*([^\n]+)',
+    r'Use\s+level\s*[:\-]?\s*([^\n]+)',
+    r'推荐用量\s*[:\-]?\s*([^\n]+)',  # Chinese
+], re.IGNORECASE | re.MULTILINE)
+
+TDS_USAGE_PATTERNS = _compile_all([
+    r'Product\s+Usage\s*(.+?)(?:\n\n|Package)',
+    r'Application\s*[:\-]?\s*(.+?)(?:\n\n|Package)',
+    r'Usage\s*[:\-]?\s*(.+?)(?:\n\n|Package)',
+], re.IGNORECASE | re.DOTALL)
+TDS_USAGE_END_RE = _compile(r'\n\n|Package', re.IGNORECASE)
+
+TDS_STORAGE_PATTERNS = _compile_all([
+    r'Storage\s+Conditions\s*(.+?)(?:\n\n|Shelf)',
+    r'Storage\s*[:\-]?\s*(.+?)(?:\n\n|Shelf)',
+    r'存储条件\s*[:\-]?\s*(.+?)(?:\n\n|$)',  # Chinese
+], re.IGNORECASE | re.DOTALL)
+TDS_STORAGE_END_RE = _compile(r'\n\n|Shelf', re.IGNORECASE)
+
+TDS_SHELF_LIFE_PATTERNS = _compile_all([
+    r'Shelf\s+life\s*([^\n]+)',
+    r'Shelf\s*life\s*[:\-]?\s*([^\n]+)',
+    r'有效期\s*[:\-]?\s*([^\n]+)',  # Chinese
+], re.IGNORECASE | re.MULTILINE)
+
+def _cached_text(file_path, mtime_ns, size, max_pages, use_mistral):
+    """Extract text once per file version and text source; mtime_ns, size and use_mistral only key the cache
+    
+    Returns the text and whether it is degraded; degraded text is not kept, so the next read tries again.
+    """
+    key = (file_path, mtime_ns, size, max_pages, use_mistral)
+    with TEXT_CACHE_LOCK:
+        if key in TEXT_CACHE:
+            TEXT_CACHE.move_to_end(key)
+            return TEXT_CACHE[key], False
+    
+    text, degraded = PDFProcessor()._extract_text(file_path, max_pages)
+    if not degraded:
+        with TEXT_CACHE_LOCK:
+            TEXT_CACHE[key] = text
+            if len(TEXT_CACHE) > TEXT_CACHE_SIZE:
+                TEXT_CACHE.popitem(last=False)
+    return text, degraded
+
 class PDFProcessor:
     def __init__(self):
-        self.logger = logging.getLogger(__name__)
+        # Files whose text came from a fallback after a failed Mistral or OCR call
+        self._degraded_files = set()
     
     def process_documents(self, file_paths: Dict[str, str]) -> Dict[str, Any]:
         """Process all three document types and extract relevant data"""
@@ -45,26 +405,19 @@ class PDFProcessor:
         }
         
         try:
-            # Process COA
-            if 'coa' in file_paths:
-                coa_data = self.extract_coa_data(file_paths['coa'])
-                extracted_data.update(coa_data)
-            
-            # Process MSDS
-            if 'msds' in file_paths:
-                msds_data = self.extract_msds_data(file_paths['msds'])
-                extracted_data.update(msds_data)
-                # Store full MSDS text for comprehensive document generation
-                msds_text = self.extract_text_from_pdf(file_paths['msds'])
-                extracted_data['msds_text'] = msds_text
-            
-            # Process TDS
-            if 'tds' in file_paths:
-                tds_data = self.extract_tds_data(file_paths['tds'])
-                extracted_data.update(tds_data)
-                # Store full TDS text for comprehensive document generation
-                tds_text = self.extract_text_from_pdf(file_paths['tds'])
-                extracted_data['tds_text'] = tds_text
+            # Parse the documents concurrently; OCR and PDF parsing dominate each one
+            jobs = [(doc_type, file_paths[doc_type]) for doc_type in ('coa', 'msds', 'tds') if doc_type in file_paths]
+            if jobs:
+                with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+                    futures = [(doc_type, executor.submit(self._in_request_context(self._process_document),
+                                                          doc_type, file_path))
+                               for doc_type, file_path in jobs]
+                    # Merge in COA, MSDS, TDS order so later documents win as before
+                    for doc_type, future in futures:
+                        try:
+                            extracted_data.update(future.result())
+                        except Exception as doc_error:
+                            logger.error(f"Error processing {doc_type.upper()} document: {str(doc_error)}")
             
             # Apply Mistral field validation if enabled
             try:
@@ -81,357 +434,493 @@ class PDFProcessor:
                 
                 if enable_validation and config_manager.get_mistral_api_key():
                     from mistral_service import MistralService
-                    mistral = MistralService()
-                    self.logger.info("Applying Mistral field validation and correction")
+                    logger.info("Applying Mistral field validation and correction")
                     # Apply validation with timeout protection
                     try:
-                        extracted_data = mistral.validate_and_correct_fields(extracted_data)
+                        with MistralService() as mistral:
+                            extracted_data = mistral.validate_and_correct_fields(extracted_data)
                     except Exception as validation_error:
-                        self.logger.warning(f"Mistral validation timeout/error: {validation_error}")
+                        logger.warning(f"Mistral validation timeout/error: {validation_error}")
             except Exception as mistral_error:
-                self.logger.warning(f"Mistral validation failed, continuing with original data: {mistral_error}")
+                logger.warning(f"Mistral validation failed, continuing with original data: {mistral_error}")
                 
         except Exception as e:
-            self.logger.error(f"Error processing documents: {str(e)}")
+            logger.error(f"Error processing documents: {str(e)}")
             raise
         
         return extracted_data
     
-    def extract_text_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF file using OCR as primary method for best accuracy"""
-        text = ""
+    def _in_request_context(self, func):
+        """Wrap func to run in a copy of the current request, which holds the session settings
         
-        # Try Mistral OCR enhancement first if enabled
+        Threads don't inherit the request, and each thread needs its own copy of it.
+        """
         try:
-            from config_manager import config_manager
-            
-            # Check if Mistral OCR is enabled via config or session
-            enable_mistral = config_manager.get_setting('enable_mistral_ocr', False)
-            if not enable_mistral:
+            from flask import has_request_context, copy_current_request_context
+            if has_request_context():
+                return copy_current_request_context(func)
+        except ImportError:
+            pass
+        return func
+    
+    def _process_document(self, doc_type: str, file_path: str) -> Dict[str, Any]:
+        """Extract the data of a single document, reusing earlier results for identical files"""
+        cache_path = None
+        try:
+            with open(file_path, 'rb') as f:
+                digest = hashlib.file_digest(f, 'sha256').hexdigest()
+            # Mistral OCR produces different text, so it gets its own entries
+            source = 'mistral' if self._mistral_ocr_enabled() else 'local'
+            cache_path = os.path.join(PDF_CACHE_DIR, f"{doc_type}-{source}-v{PDF_CACHE_VERSION}-{digest}.json")
+            with open(cache_path, 'rb') as f:
+                data = loads(f.read())
+            # Mark the entry as recently used for _prune_cache
+            os.utime(cache_path)
+            return data
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as cache_error:
+            logger.warning(f"Extraction cache unavailable for {file_path}: {cache_error}")
+        
+        data = getattr(self, f'extract_{doc_type}_data')(file_path)
+        if doc_type in ('msds', 'tds'):
+            # Store full text for comprehensive document generation
+            data[f'{doc_type}_text'] = self.extract_text_from_pdf(file_path)
+        
+        # Results built on degraded text would otherwise stick until the file changes
+        if cache_path and file_path not in self._degraded_files:
+            self._write_cache(cache_path, data)
+            self._prune_cache()
+        return data
+    
+    def _write_cache(self, cache_path: str, data: Dict[str, Any]):
+        """Atomically store extraction results so concurrent workers never see partial files"""
+        tmp_path = None
+        try:
+            os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+            payload = dumps(data)
+            with tempfile.NamedTemporaryFile('wb', dir=PDF_CACHE_DIR, suffix='.tmp', delete=False) as f:
+                tmp_path = f.name
+                f.write(payload)
+            os.replace(tmp_path, cache_path)
+            tmp_path = None
+        except (OSError, TypeError, ValueError) as cache_error:
+            logger.warning(f"Could not cache extraction results: {cache_error}")
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+    
+    def _prune_cache(self):
+        """Remove cache entries beyond PDF_CACHE_MAX_FILES or unused for PDF_CACHE_MAX_AGE"""
+        try:
+            with os.scandir(PDF_CACHE_DIR) as entries:
+                files = sorted(((entry.stat().st_mtime, entry.path) for entry in entries if entry.is_file()),
+                               reverse=True)
+        except OSError as cache_error:
+            logger.warning(f"Could not prune extraction cache: {cache_error}")
+            return
+        
+        cutoff = time.time() - PDF_CACHE_MAX_AGE
+        for index, (mtime, path) in enumerate(files):
+            if index >= PDF_CACHE_MAX_FILES or mtime < cutoff:
                 try:
-                    from flask import session
-                    enable_mistral = session.get('enable_mistral_ocr', False)
-                except:
+                    os.unlink(path)
+                except OSError:
                     pass
-            
-            if enable_mistral and config_manager.get_mistral_api_key():
+    
+    def _mistral_ocr_enabled(self) -> bool:
+        """Check if Mistral OCR is enabled via config or session and an API key is set"""
+        from config_manager import config_manager
+        
+        enable_mistral = config_manager.get_setting('enable_mistral_ocr', False)
+        if not enable_mistral:
+            try:
+                from flask import session
+                enable_mistral = session.get('enable_mistral_ocr', False)
+            except:
+                pass
+        return bool(enable_mistral and config_manager.get_mistral_api_key())
+    
+    def extract_text_from_pdf(self, file_path: str, max_pages: int = None) -> str:
+        """Extract text from PDF file, reading the text layer first and OCRing only the pages without one
+        
+        Pages whose text layer has fewer than MIN_PAGE_TEXT characters are OCR'd; the rest are taken
+        as they are. When max_pages is given only the first max_pages pages are read.
+        """
+        stat = os.stat(file_path)
+        text, degraded = _cached_text(file_path, stat.st_mtime_ns, stat.st_size, max_pages,
+                                      self._mistral_ocr_enabled())
+        if degraded:
+            self._degraded_files.add(file_path)
+        return text
+    
+    def _extract_text(self, file_path: str, max_pages: int = None) -> Tuple[str, bool]:
+        """Extract text from PDF file without consulting the text cache
+        
+        Returns the text and whether a failed Mistral or OCR call left it degraded.
+        """
+        degraded = False
+        # Try Mistral OCR enhancement first if enabled
+        try:
+            if self._mistral_ocr_enabled():
                 from mistral_service import MistralService
-                mistral = MistralService()
-                
-                # Convert PDF to image for Mistral OCR
-                from pdf2image import convert_from_path
-                import tempfile
                 
-                images = convert_from_path(file_path, dpi=300, first_page=1, last_page=1)
-                if images:
-                    # Save first page as temporary image for Mistral
-                    with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_img:
-                        images[0].save(temp_img.name, 'JPEG')
-                        temp_img_path = temp_img.name
-                    
-                    try:
-                        self.logger.info(f"Using Mistral OCR enhancement for {file_path}")
-                        # Use shorter timeout to prevent worker timeout
-                        mistral_text = mistral.enhance_ocr_extraction(temp_img_path)
-                        if len(mistral_text.strip()) > 100:  # Mistral found substantial content
-                            self.logger.info(f"Mistral OCR extracted {len(mistral_text)} characters")
-                            os.unlink(temp_img_path)  # Clean up temp file
-                            return mistral_text
-                    except Exception as mistral_api_error:
-                        self.logger.warning(f"Mistral API call failed: {mistral_api_error}")
-                    finally:
-                        if os.path.exists(temp_img_path):
+                with MistralService() as mistral:
+                    # Convert PDF to image for Mistral OCR
+                    images = convert_from_path(file_path, dpi=300, first_page=1, last_page=1)
+                    if images:
+                        # Save first page as temporary image for Mistral
+                        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_img:
+                            images[0].save(temp_img.name, 'JPEG')
+                            temp_img_path = temp_img.name
+                        
+                        try:
+                            logger.info(f"Using Mistral OCR enhancement for {file_path}")
+                            # Use shorter timeout to prevent worker timeout
+                            mistral_text = mistral.enhance_ocr_extraction(temp_img_path)
+                            if len(mistral_text.strip()) > 100:  # Mistral found substantial content
+                                logger.info(f"Mistral OCR extracted {len(mistral_text)} characters")
+                                return mistral_text, False
+                        except Exception as mistral_api_error:
+                            logger.warning(f"Mistral API call failed: {mistral_api_error}")
+                            degraded = True
+                        finally:
+                            # Clean up temp file
                             os.unlink(temp_img_path)
         except Exception as mistral_error:
-            self.logger.warning(f"Mistral OCR setup failed: {mistral_error}, falling back to standard OCR")
+            logger.warning(f"Mistral OCR setup failed: {mistral_error}, falling back to standard OCR")
+            degraded = True
         
-        # Fallback to standard OCR if Mistral is not available or fails
-        if OCR_AVAILABLE:
-            try:
-                self.logger.info(f"Using standard OCR for {file_path}")
-                text = self.extract_text_with_ocr(file_path)
-                if len(text.strip()) > 50:  # OCR found substantial content
-                    self.logger.info(f"Standard OCR extracted {len(text)} characters")
-                    return text
-            except Exception as ocr_error:
-                self.logger.warning(f"Standard OCR failed: {str(ocr_error)}, falling back to pdfplumber")
-        
-        # Fallback to pdfplumber if OCR fails or not available
+        # Read the text layer first; only scanned pages without one need OCR
+        page_texts = None
         try:
-            with pdfplumber.open(file_path) as pdf:
-                total_pages = len(pdf.pages)
-                self.logger.info(f"Fallback: Processing {total_pages} pages with pdfplumber from {file_path}")
-                
-                for i, page in enumerate(pdf.pages):
-                    page_text = page.extract_text()
-                    if page_text and len(page_text.strip()) > 5:
-                        text += f"\n--- PAGE {i+1} ---\n" + page_text + "\n"
-                    
-                self.logger.info(f"Pdfplumber extracted {len(text)} characters from all pages")
-                    
+            page_texts = self.extract_text_layer(file_path, max_pages)
         except Exception as e:
-            self.logger.error(f"Both OCR and pdfplumber failed for {file_path}: {str(e)}")
-            raise e
+            if not OCR_AVAILABLE:
+                logger.error(f"Both OCR and pdfplumber failed for {file_path}: {str(e)}")
+                raise e
+            logger.warning(f"Pdfplumber failed: {str(e)}, falling back to OCR for all pages")
         
-        return text
+        ocr_texts = {}
+        if OCR_AVAILABLE:
+            if page_texts is None:
+                missing_pages = None
+            else:
+                missing_pages = [i + 1 for i, page_text in enumerate(page_texts)
+                                 if len(page_text.strip()) < MIN_PAGE_TEXT]
+            if missing_pages is None or missing_pages:
+                try:
+                    logger.info(f"Using standard OCR for {file_path}")
+                    ocr_texts = self._ocr_pages(file_path, max_pages, missing_pages)
+                except Exception as ocr_error:
+                    if page_texts is None:
+                        raise
+                    logger.warning(f"Standard OCR failed: {str(ocr_error)}, using the text layer only")
+                    degraded = True
+        
+        # Splice OCR'd pages back into the text layer in page order
+        chunks = []
+        for number in range(1, max(len(page_texts or ()), max(ocr_texts, default=0)) + 1):
+            ocr_text = ocr_texts.get(number, "")
+            if ocr_text.strip():
+                chunks.append(f"\n--- PAGE {number} (OCR) ---\n{ocr_text}")
+            elif page_texts and number <= len(page_texts) and len(page_texts[number - 1].strip()) > 5:
+                chunks.append(f"\n--- PAGE {number} ---\n{page_texts[number - 1]}\n")
+        text = "".join(chunks)
+        logger.info(f"Extracted {len(text)} characters from {file_path} ({len(ocr_texts)} pages OCR'd)")
+        return text, degraded
+    
+    def extract_text_layer(self, file_path: str, max_pages: int = None) -> List[str]:
+        """Extract the text layer of each page, with pypdfium2 when installed and pdfplumber otherwise
+        
+        pypdfium2 extracts plain text much faster than pdfplumber's layout analysis, so pdfplumber
+        only runs when pypdfium2 is missing, fails or finds no text.
+        """
+        if PDFIUM_AVAILABLE:
+            try:
+                page_texts = self.extract_text_with_pdfium(file_path, max_pages)
+                if any(len(page_text.strip()) > 5 for page_text in page_texts):
+                    return page_texts
+            except Exception as pdfium_error:
+                logger.warning(f"Pypdfium2 failed: {str(pdfium_error)}, falling back to pdfplumber")
+        return self.extract_text_with_pdfplumber(file_path, max_pages)
     
-    def extract_text_with_ocr(self, file_path: str) -> str:
-        """Extract text using OCR from PDF"""
+    def extract_text_with_pdfium(self, file_path: str, max_pages: int = None) -> List[str]:
+        """Extract the text layer of each page with pypdfium2"""
+        page_texts = []
+        with PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(file_path)
+            try:
+                logger.info(f"Processing {len(pdf)} pages with pypdfium2 from {file_path}")
+                for i in range(min(len(pdf), max_pages or len(pdf))):
+                    page = pdf[i]
+                    textpage = page.get_textpage()
+                    try:
+                        # PDFium ends lines with \r\n; the extraction patterns expect \n
+                        page_texts.append(textpage.get_text_range().replace('\r\n', '\n'))
+                    finally:
+                        textpage.close()
+                        page.close()
+            finally:
+                pdf.close()
+        return page_texts
+    
+    def extract_text_with_pdfplumber(self, file_path: str, max_pages: int = None) -> List[str]:
+        """Extract the text layer of each page with pdfplumber"""
+        pages = list(range(1, max_pages + 1)) if max_pages else None
+        with _open_pdf(file_path, pages) as pdf:
+            logger.info(f"Processing {len(pdf.pages)} pages with pdfplumber from {file_path}")
+            page_texts = []
+            for page in pdf.pages:
+                page_texts.append(page.extract_text() or "")
+                # Free the page's parsed layout objects so memory stays at about one page
+                page.close()
+            return page_texts
+    
+    def extract_text_with_ocr(self, file_path: str, max_pages: int = None, pages: List[int] = None) -> str:
+        """Extract text using OCR from PDF, optionally from the given page numbers only"""
+        page_texts = self._ocr_pages(file_path, max_pages, pages)
+        return "".join(f"\n--- PAGE {number} (OCR) ---\n{page_text}" for number, page_text in page_texts.items())
+    
+    def _ocr_pages(self, file_path: str, max_pages: int = None, pages: List[int] = None) -> Dict[int, str]:
+        """OCR PDF pages, returning their text keyed by page number"""
         if not OCR_AVAILABLE:
             raise Exception("OCR dependencies not available")
             
-        text = ""
         try:
-            # Convert PDF pages to images
-            images = convert_from_path(file_path, dpi=300)
-            
-            for i, image in enumerate(images):
-                # Convert PIL image to numpy array
-                img_array = np.array(image)
-                
-                if CV2_AVAILABLE:
-                    # Preprocess image for better OCR using OpenCV
-                    if len(img_array.shape) == 3:
-                        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-                    else:
-                        gray = img_array
-                    
-                    # Apply image processing to improve OCR accuracy
-                    gray = cv2.medianBlur(gray, 3)
-                    
-                    # Use Tesseract to extract text with timeout and fallback
-                    try:
-                        page_text = pytesseract.image_to_string(gray, lang='eng', timeout=10)
-                    except Exception:
-                        try:
-                            page_text = pytesseract.image_to_string(gray, timeout=10)
-                        except Exception:
-                            page_text = ""
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                # Render pages to JPEG files instead of holding every page image in memory
+                if pages is None:
+                    image_paths = convert_from_path(file_path, dpi=OCR_DPI, last_page=max_pages,
+                                                    output_folder=tmp_dir, fmt='jpeg',
+                                                    thread_count=os.cpu_count() or 1, paths_only=True)
+                    pages = range(1, len(image_paths) + 1)
                 else:
-                    # Use Tesseract directly on the image without OpenCV preprocessing
-                    try:
-                        page_text = pytesseract.image_to_string(image, lang='eng', timeout=10)
-                    except Exception:
-                        try:
-                            page_text = pytesseract.image_to_string(image, timeout=10)
-                        except Exception:
-                            page_text = ""
+                    image_paths = [path for number in pages
+                                   for path in convert_from_path(file_path, dpi=OCR_DPI, first_page=number,
+                                                                 last_page=number, output_folder=tmp_dir,
+                                                                 fmt='jpeg', paths_only=True)]
+                if not image_paths:
+                    return {}
                 
-                text += f"\n--- PAGE {i+1} (OCR) ---\n" + page_text
+                # Each page runs in its own single-threaded tesseract process, so threads are enough
+                with ThreadPoolExecutor(max_workers=min(len(image_paths), os.cpu_count() or 1)) as executor:
+                    page_texts = list(executor.map(functools.partial(self._ocr_page, file_path),
+                                                   pages, image_paths))
                 
         except Exception as e:
-            self.logger.error(f"OCR extraction failed for {file_path}: {str(e)}")
+            logger.error(f"OCR extraction failed for {file_path}: {str(e)}")
             raise
             
-        return text
+        return dict(zip(pages, page_texts))
+    
+    def _ocr_page(self, file_path: str, page_number: int, image_path: str) -> str:
+        """OCR a rendered page, re-rendering it at a higher DPI when recognition is poor"""
+        with Image.open(image_path) as image:
+            page_text, confidence = self._ocr_image(image)
+        if confidence is None or confidence >= OCR_MIN_CONFIDENCE:
+            return page_text
+        
+        images = convert_from_path(file_path, dpi=OCR_RETRY_DPI,
+                                   first_page=page_number, last_page=page_number)
+        if not images:
+            return page_text
+        retry_text, retry_confidence = self._ocr_image(images[0])
+        images[0].close()
+        if retry_confidence is not None and retry_confidence > confidence:
+            return retry_text
+        return page_text
+    
+    def _ocr_image(self, image):
+        """OCR a single page image, returning its text and mean word confidence"""
+        if CV2_AVAILABLE:
+            # Preprocess image for better OCR using OpenCV
+            img_array = np.asarray(image)
+            if len(img_array.shape) == 3:
+                gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY, dst=_ocr_buffer('gray', img_array.shape[:2]))
+            else:
+                gray = img_array
+            
+            # Even out uneven lighting on low-contrast scans before thresholding
+            if gray.std() < OCR_CLAHE_MAX_STD:
+                gray = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+            
+            # Binarize with Otsu so tesseract gets clean black-on-white input
+            _, image = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU,
+                                     dst=_ocr_buffer('binary', gray.shape))
+        
+        if TESSEROCR_AVAILABLE:
+            try:
+                api = _tesserocr_api()
+                api.SetImage(image if isinstance(image, Image.Image) else Image.fromarray(image))
+                page_text = api.GetUTF8Text()
+                confidences = [conf for conf in api.AllWordConfidences() if conf >= 0]
+                return page_text, (sum(confidences) / len(confidences) if confidences else None)
+            except Exception as e:
+                logger.warning(f"tesserocr failed, falling back to pytesseract: {str(e)}")
+        
+        # Use Tesseract to extract text with timeout and fallback; one run yields text and word data
+        try:
+            page_text, tsv = pytesseract.run_and_get_multiple_output(
+                image, extensions=['txt', 'tsv'], lang='eng', timeout=10)
+        except Exception:
+            try:
+                page_text, tsv = pytesseract.run_and_get_multiple_output(
+                    image, extensions=['txt', 'tsv'], timeout=10)
+            except Exception:
+                return "", None
+        
+        # Words carry a 0-100 confidence in the last-but-one column; layout rows use -1
+        confidences = []
+        for row in tsv.splitlines()[1:]:
+            fields = row.split('\t')
+            if len(fields) == 12 and fields[11].strip():
+                conf = float(fields[10])
+                if conf >= 0:
+                    confidences.append(conf)
+        return page_text, (sum(confidences) / len(confidences) if confidences else None)
     
     def extract_coa_data(self, file_path: str) -> Dict[str, Any]:
         """Extract data from Certificate of Analysis"""
-        text = self.extract_text_from_pdf(file_path)
+        text = self.extract_text_from_pdf(file_path, max_pages=COA_MAX_PAGES)
+        folded = _fold(text)
         data = {}
         
         # Extract product name - enhanced patterns
-        product_patterns = [
-            r'Product\s+Name\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'Product\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'Name\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'Chemical\s+Name\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'Trade\s+Name\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'产品名称\s*[:\-]?\s*(.+?)(?:\n|$)',  # Chinese
-        ]
-        
-        for pattern in product_patterns:
-            product_match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in COA_PRODUCT_PATTERNS:
+            product_match = pattern.search(folded)
             if product_match:
-                product_name = product_match.group(1).strip()
+                product_name = _captured(product_match, text).strip()
                 if len(product_name) > 2:  # Basic validation
                     data['product_name'] = product_name
                     break
         
         # Extract INCI name - enhanced patterns
-        inci_patterns = [
-            r'INCI\s+Name\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'INCI\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'国际化妆品原料命名\s*[:\-]?\s*(.+?)(?:\n|$)',  # Chinese INCI
-        ]
-        
-        for pattern in inci_patterns:
-            inci_match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in COA_INCI_PATTERNS:
+            inci_match = pattern.search(folded)
             if inci_match:
-                data['inci_name'] = inci_match.group(1).strip()
+                data['inci_name'] = _captured(inci_match, text).strip()
                 break
         
         # Extract batch/lot number - enhanced patterns
-        batch_patterns = [
-            r'Batch\s+(?:No\.?|Number)\s*[:\-]?\s*([A-Z0-9\-]+)',
-            r'Lot\s+(?:No\.?|Number)\s*[:\-]?\s*([A-Z0-9\-]+)',
-            r'批号\s*[:\-]?\s*([A-Z0-9\-]+)',  # Chinese
-            r'Batch\s*[:\-]?\s*([A-Z0-9\-]+)',
-            r'Lot\s*[:\-]?\s*([A-Z0-9\-]+)',
-        ]
-        
-        for pattern in batch_patterns:
-            batch_match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in COA_BATCH_PATTERNS:
+            batch_match = pattern.search(folded)
             if batch_match:
-                data['batch_number'] = batch_match.group(1).strip()
+                data['batch_number'] = _captured(batch_match, text).strip()
                 break
         
         # Extract dates - enhanced patterns
-        date_patterns = [
-            r'Manufacturing\s+Date\s*[:\-]?\s*([0-9\-\/\.]+)',
-            r'Mfg\.?\s+Date\s*[:\-]?\s*([0-9\-\/\.]+)',
-            r'生产日期\s*[:\-]?\s*([0-9\-\/\.]+)',  # Chinese
-            r'Expiry\s+Date\s*[:\-]?\s*([0-9\-\/\.]+)',
-            r'Exp\.?\s+Date\s*[:\-]?\s*([0-9\-\/\.]+)',
-            r'有效期\s*[:\-]?\s*([0-9\-\/\.]+)',  # Chinese
-        ]
-        
-        for pattern in date_patterns:
-            date_match = re.search(pattern, text, re.IGNORECASE)
-            if date_match and ('Manufacturing' in pattern or 'Mfg' in pattern or '生产' in pattern):
-                data['manufacturing_date'] = date_match.group(1).strip()
-            elif date_match and ('Expiry' in pattern or 'Exp' in pattern or '有效' in pattern):
-                data['expiry_date'] = date_match.group(1).strip()
+        for pattern in COA_MFG_DATE_PATTERNS:
+            date_match = pattern.search(folded)
+            if date_match:
+                data['manufacturing_date'] = _captured(date_match, text).strip()
+        
+        for pattern in COA_EXPIRY_DATE_PATTERNS:
+            date_match = pattern.search(folded)
+            if date_match:
+                data['expiry_date'] = _captured(date_match, text).strip()
         
         # Extract test results - enhanced table detection
         test_results = []
-        lines = text.split('\n')
-        
-        # Look for table headers in multiple languages
-        table_header_patterns = [
-            r'Test\s+Items?.*Specification.*Result',
-            r'Item.*Specification.*Result',
-            r'Parameter.*Specification.*Result',
-            r'Property.*Value',
-            r'检测项目.*规格.*结果',  # Chinese
-        ]
-        
-        for i, line in enumerate(lines):
-            line_clean = re.sub(r'\s+', ' ', line.strip())
-            for header_pattern in table_header_patterns:
-                if re.search(header_pattern, line_clean, re.IGNORECASE):
-                    # Found table header, extract data rows
-                    for j in range(i+1, min(i+30, len(lines))):
-                        test_line = lines[j].strip()
-                        if not test_line or len(test_line) < 5:
-                            continue
-                        if any(x in test_line.lower() for x in ['issued', 'page', 'date', 'signature', 'approved', 'tel:', 'email:', 'address']):
-                            continue
-                            
-                        # Try different parsing methods
-                        parts = None
-                        
-                        # Method 1: Tab or multiple spaces
-                        if '\t' in test_line:
-                            parts = test_line.split('\t')
-                        elif re.search(r'\s{3,}', test_line):
-                            parts = re.split(r'\s{3,}', test_line)
-                        else:
-                            # Method 2: Smart splitting on whitespace
-                            parts = re.split(r'\s{2,}', test_line)
-                        
-                        if parts and len(parts) >= 2:
-                            test_item = parts[0].strip()
-                            if len(parts) >= 3:
-                                specification = parts[1].strip()
-                                result = parts[2].strip()
-                            else:
-                                specification = ''
-                                result = parts[1].strip()
-                            
-                            if test_item and result:
-                                test_results.append({
-                                    'test_item': test_item,
-                                    'specification': specification,
-                                    'result': result,
-                                    'document_type': 'COA'
-                                })
-                    break
+        
+        # Look for table headers in multiple languages in one pass over the text;
+        # only the lines under a header are split out, not the whole document
+        for header in COA_TABLE_HEADER_RE.finditer(folded):
+            # Found table header, extract data rows
+            for row in _lines_from(text, header.start(), 30)[1:]:
+                test_line = row.strip()
+                if not test_line or len(test_line) < 5:
+                    continue
+                test_line_lower = test_line.lower()
+                if any(x in test_line_lower for x in COA_ROW_SKIP_WORDS):
+                    continue
+                    
+                # Try different parsing methods
+                parts = None
+                
+                # Method 1: Tab or multiple spaces (only the first three columns are used)
+                if '\t' in test_line:
+                    parts = test_line.split('\t', 3)
+                else:
+                    # Split once; more than one part means a wide gap was found
+                    parts = WIDE_SPACE_RE.split(test_line, 3)
+                    if len(parts) == 1:
+                        # Method 2: Smart splitting on whitespace
+                        parts = MULTI_SPACE_RE.split(test_line, 3)
+                
+                if parts and len(parts) >= 2:
+                    test_item = parts[0].strip()
+                    if len(parts) >= 3:
+                        specification = parts[1].strip()
+                        result = parts[2].strip()
+                    else:
+                        specification = ''
+                        result = parts[1].strip()
+                    
+                    if test_item and result:
+                        test_results.append({
+                            'test_item': test_item,
+                            'specification': specification,
+                            'result': result,
+                            'document_type': 'COA'
+                        })
+            # The rows under the first header are the table; later matches would only repeat them
+            break
         
         data['test_results'] = test_results
         return data
     
     def extract_msds_data(self, file_path: str) -> Dict[str, Any]:
         """Extract data from Material Safety Data Sheet"""
+        # Same cache key as the msds_text kept by _process_document, so the file is read once
         text = self.extract_text_from_pdf(file_path)
+        folded = _fold(text)
         data = {}
         
         # Extract product name from MSDS as well - enhanced
-        product_patterns = [
-            r'Product\s*name\s*(.+?)(?:\n|CAS)',  # Stop at CAS or newline
-            r'Product\s+(?:name|identifier)\s*[:\-]?\s*(.+?)(?:\n|CAS)',
-            r'Productname\s*(.+?)(?:\n|CAS)',  # No space version
-            r'Chemical\s+Name\s*[:\-]?\s*(.+?)(?:\n|$)',
-        ]
-        
-        for pattern in product_patterns:
-            product_match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in MSDS_PRODUCT_PATTERNS:
+            product_match = pattern.search(folded)
             if product_match:
-                product_name = product_match.group(1).strip()
-                # Clean up common artifacts
-                product_name = re.sub(r'\s+', ' ', product_name)
-                if len(product_name) > 2 and 'section' not in product_name.lower() and 'identifier' not in product_name.lower():
+                # Clean up common artifacts by collapsing whitespace runs
+                product_name = ' '.join(_captured(product_match, text).split())
+                product_name_lower = product_name.lower()
+                if len(product_name) > 2 and not any(x in product_name_lower for x in MSDS_PRODUCT_REJECT_WORDS):
                     data['product_name'] = product_name
                     break
         
         # Extract CAS number - enhanced
-        cas_patterns = [
-            r'CAS\s*(?:No\.?|Number)?\s*[:\-]?\s*(\d{2,7}-\d{2}-\d)',
-            r'CAS-No\.\s*(\d{2,7}-\d{2}-\d)',
-            r'CAS编号\s*[:\-]?\s*(\d{2,7}-\d{2}-\d)',  # Chinese
-        ]
-        
-        for pattern in cas_patterns:
-            cas_match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in MSDS_CAS_PATTERNS:
+            cas_match = pattern.search(folded)
             if cas_match:
-                data['cas_number'] = cas_match.group(1).strip()
+                data['cas_number'] = _captured(cas_match, text).strip()
                 break
         
         # Extract molecular formula - enhanced
-        formula_patterns = [
-            r'Molecular\s+formula\s*[:\-]?\s*[（(]?([A-Z0-9\(\)]+n?)[）)]?',
-            r'Formula\s*[:\-]?\s*[（(]?([A-Z0-9\(\)]+n?)[）)]?',
-            r'M\.F\.\s*[:\-]?\s*[（(]?([A-Z0-9\(\)]+n?)[）)]?',
-            r'分子式\s*[:\-]?\s*[（(]?([A-Z0-9\(\)]+n?)[）)]?',  # Chinese
-        ]
-        
-        for pattern in formula_patterns:
-            formula_match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in MSDS_FORMULA_PATTERNS:
+            formula_match = pattern.search(folded)
             if formula_match:
-                formula = formula_match.group(1).strip()
+                formula = _captured(formula_match, text).strip()
                 if len(formula) > 1:
                     data['molecular_formula'] = formula
                     break
         
         # Extract supplier/manufacturer name - enhanced
-        supplier_patterns = [
-            r'Manufacturer\s*[:\-]?\s*(.+?)(?:\n|Address)',
-            r'Company\s+Name\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'Supplier\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'制造商\s*[:\-]?\s*(.+?)(?:\n|$)',  # Chinese
-        ]
-        
-        for pattern in supplier_patterns:
-            supplier_match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in MSDS_SUPPLIER_PATTERNS:
+            supplier_match = pattern.search(folded)
             if supplier_match:
-                supplier_name = supplier_match.group(1).strip()
+                supplier_name = _captured(supplier_match, text).strip()
                 if len(supplier_name) > 3:
                     data['supplier_name'] = supplier_name
                     break
         
         # Extract INCI name if available in MSDS - enhanced
-        inci_patterns = [
-            r'INCI\s*(?:Name)?\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'Synonyms\s*[:\-]?\s*(.+?)(?:\n|Formula)',  # Sometimes INCI is in synonyms
-        ]
-        
-        for pattern in inci_patterns:
-            inci_match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in MSDS_INCI_PATTERNS:
+            inci_match = pattern.search(folded)
             if inci_match:
-                inci_name = inci_match.group(1).strip()
+                inci_name = _captured(inci_match, text).strip()
                 # Filter out obvious non-INCI content
-                if (len(inci_name) > 2 and not any(x in inci_name.lower() for x in 
-                    ['poly', 'according', 'required', 'disposal', 'none'])):
+                inci_name_lower = inci_name.lower()
+                if len(inci_name) > 2 and not any(x in inci_name_lower for x in MSDS_INCI_REJECT_WORDS):
                     data['inci_name'] = inci_name
                     break
         
@@ -439,46 +928,29 @@ class PDFProcessor:
         safety_data = {}
         
         # pH value - enhanced
-        ph_patterns = [
-            r'pH\s*(?:value)?\s*[:\-]?\s*([\d\.\-\~\s]+)',
-            r'pH值\s*[:\-]?\s*([\d\.\-\~\s]+)',  # Chinese
-        ]
-        
-        for pattern in ph_patterns:
-            ph_match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in MSDS_PH_PATTERNS:
+            ph_match = pattern.search(folded)
             if ph_match:
-                safety_data['ph'] = ph_match.group(1).strip()
+                safety_data['ph'] = _captured(ph_match, text).strip()
                 break
         
         # Physical properties
         physical_props = {}
         
         # Appearance - enhanced
-        appearance_patterns = [
-            r'Appearance\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'Physical\s+state\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'外观\s*[:\-]?\s*(.+?)(?:\n|$)',  # Chinese
-        ]
-        
-        for pattern in appearance_patterns:
-            appearance_match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in MSDS_APPEARANCE_PATTERNS:
+            appearance_match = pattern.search(folded)
             if appearance_match:
-                appearance = appearance_match.group(1).strip()
+                appearance = _captured(appearance_match, text).strip()
                 if len(appearance) > 2:
                     physical_props['appearance'] = appearance
                     break
         
         # Solubility - enhanced
-        solubility_patterns = [
-            r'Solubility\s*(?:in\s+water)?\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'Water\s+solubility\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'溶解性\s*[:\-]?\s*(.+?)(?:\n|$)',  # Chinese
-        ]
-        
-        for pattern in solubility_patterns:
-            solubility_match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in MSDS_SOLUBILITY_PATTERNS:
+            solubility_match = pattern.search(folded)
             if solubility_match:
-                physical_props['solubility'] = solubility_match.group(1).strip()
+                physical_props['solubility'] = _captured(solubility_match, text).strip()
                 break
         
         data['safety_data'] = safety_data
@@ -489,73 +961,47 @@ class PDFProcessor:
     def extract_tds_data(self, file_path: str) -> Dict[str, Any]:
         """Extract data from Technical Data Sheet"""
         text = self.extract_text_from_pdf(file_path)
+        folded = _fold(text)
         data = {}
         
         # Extract product information from TDS
-        product_patterns = [
-            r'Product\s*name\s*(.+?)(?:\n|$)',
-            r'TDS\s+of\s+(.+?)(?:\n|$)',
-            r'产品名称\s*(.+?)(?:\n|$)',  # Chinese
-        ]
-        
-        for pattern in product_patterns:
-            product_match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in TDS_PRODUCT_PATTERNS:
+            product_match = pattern.search(folded)
             if product_match:
-                product_name = product_match.group(1).strip()
+                product_name = _captured(product_match, text).strip()
                 if len(product_name) > 2:
                     data['product_name'] = product_name
                     break
         
         # Extract INCI from TDS
-        inci_patterns = [
-            r'INCI\s*(.+?)(?:\n|$)',
-            r'INCI\s+Name\s*(.+?)(?:\n|$)',
-        ]
-        
-        for pattern in inci_patterns:
-            inci_match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in TDS_INCI_PATTERNS:
+            inci_match = pattern.search(folded)
             if inci_match:
-                data['inci_name'] = inci_match.group(1).strip()
+                data['inci_name'] = _captured(inci_match, text).strip()
                 break
         
         # Extract CAS from TDS
-        cas_patterns = [
-            r'CAS\s*(\d{2,7}-\d{2}-\d)',
-        ]
-        
-        for pattern in cas_patterns:
-            cas_match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in TDS_CAS_PATTERNS:
+            cas_match = pattern.search(folded)
             if cas_match:
-                data['cas_number'] = cas_match.group(1).strip()
+                data['cas_number'] = _captured(cas_match, text).strip()
                 break
         
         # Extract molecular formula from TDS - enhanced
-        formula_patterns = [
-            r'Molecularformula\s*[（(]?([A-Z0-9\(\)]+n?)[）)]?',
-            r'Molecular\s+formula\s*[（(]?([A-Z0-9\(\)]+n?)[）)]?',
-            r'Formula\s*[（(]?\s*([A-Z0-9H\(\)]{3,}n?)\s*[）)]?',  # More flexible pattern
-            r'[（(]\s*([C][H0-9N\(\)O]+n?)\s*[）)]',  # Pattern in parentheses starting with C
-        ]
-        
-        for pattern in formula_patterns:
-            formula_match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in TDS_FORMULA_PATTERNS:
+            formula_match = pattern.search(folded)
             if formula_match:
-                formula = formula_match.group(1).strip()
+                formula = _captured(formula_match, text).strip()
                 # Validate it looks like a molecular formula
                 if len(formula) > 2 and any(c.isdigit() for c in formula):
                     data['molecular_formula'] = formula
                     break
         
         # Extract appearance from TDS
-        appearance_patterns = [
-            r'Appearance\s*(.+?)(?:\n|$)',
-            r'Physical\s+form\s*(.+?)(?:\n|$)',
-        ]
-        
-        for pattern in appearance_patterns:
-            appearance_match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in TDS_APPEARANCE_PATTERNS:
+            appearance_match = pattern.search(folded)
             if appearance_match:
-                appearance = appearance_match.group(1).strip()
+                appearance = _captured(appearance_match, text).strip()
                 if len(appearance) > 3:
                     if 'physical_properties' not in data:
                         data['physical_properties'] = {}
@@ -565,45 +1011,37 @@ class PDFProcessor:
         # Extract specifications table - enhanced
         specifications = {}
         test_results = []
-        lines = text.split('\n')
-        
-        # Look for specification tables with multiple patterns
-        spec_patterns = [
-            r'Specification',
-            r'Test\s+Items?',
-            r'Parameter',
-            r'Property',
-            r'Analysis',
-        ]
-        
-        for i, line in enumerate(lines):
-            line_clean = re.sub(r'\s+', ' ', line.strip())
-            
-            # Check if this line contains specification headers
-            is_spec_header = any(re.search(pattern, line_clean, re.IGNORECASE) for pattern in spec_patterns)
+        
+        # Look for specification tables with multiple patterns, visiting only header lines
+        for header in TDS_SPEC_HEADER_RE.finditer(folded):
+            lines = _lines_from(text, header.start(), 50)
+            line_clean = ' '.join(lines[0].split())
             
-            if is_spec_header and len(line_clean) > 10:
+            if len(line_clean) > 10:
                 # Found specification section, extract data
-                for j in range(i+1, min(i+50, len(lines))):
-                    spec_line = lines[j].strip()
+                for row in lines[1:]:
+                    spec_line = row.strip()
                     if not spec_line or len(spec_line) < 3:
                         continue
                     
                     # Skip obvious non-data lines
-                    skip_keywords = ['recommended', 'use', 'package', 'storage', 'shelf', 'product', 'tel:', 'email:', 'address', 'website', 'web:', 'add:']
-                    if any(keyword in spec_line.lower() for keyword in skip_keywords):
+                    spec_line_lower = spec_line.lower()
+                    if any(keyword in spec_line_lower for keyword in TDS_ROW_SKIP_WORDS):
                         continue
                     
                     # Try to parse the specification line
                     parts = None
+                    # Split once; more than one part means a gap of 2+ spaces was found.
+                    # Only the first two columns are used, so stop splitting after them
+                    space_parts = MULTI_SPACE_RE.split(spec_line, 2)
                     
                     # Check for various delimiters
                     if '≥' in spec_line or '≤' in spec_line or '±' in spec_line:
                         # Likely a specification with value
-                        if re.search(r'\s{2,}', spec_line):
-                            parts = re.split(r'\s{2,}', spec_line)
+                        if len(space_parts) > 1:
+                            parts = space_parts
                         elif '\t' in spec_line:
-                            parts = spec_line.split('\t')
+                            parts = spec_line.split('\t', 2)
                         else:
                             # Try to split on the symbol
                             for symbol in ['≥', '≤', '±']:
@@ -612,10 +1050,10 @@ class PDFProcessor:
                                     parts = [before.strip(), symbol + after.strip()]
                                     break
                     
-                    elif re.search(r'\s{2,}', spec_line):
-                        parts = re.split(r'\s{2,}', spec_line)
+                    elif len(space_parts) > 1:
+                        parts = space_parts
                     elif '\t' in spec_line:
-                        parts = spec_line.split('\t')
+                        parts = spec_line.split('\t', 2)
                     else:
                         # Single item, might be parameter name only
                         parts = [spec_line]
@@ -642,55 +1080,37 @@ class PDFProcessor:
         data['test_results'] = test_results
         
         # Extract usage information - enhanced
-        usage_patterns = [
-            r'Recommended\s+use\s+level\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'Use\s+level\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'推荐用量\s*[:\-]?\s*(.+?)(?:\n|$)',  # Chinese
-        ]
-        
-        for pattern in usage_patterns:
-            use_match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in TDS_USE_LEVEL_PATTERNS:
+            use_match = pattern.search(folded)
             if use_match:
-                data['recommended_use_level'] = use_match.group(1).strip()
+                data['recommended_use_level'] = _captured(use_match, text).strip()
                 break
         
         # Extract usage description
-        usage_desc_patterns = [
-            r'Product\s+Usage\s*(.+?)(?:\n\n|Package)',
-            r'Application\s*[:\-]?\s*(.+?)(?:\n\n|Package)',
-            r'Usage\s*[:\-]?\s*(.+?)(?:\n\n|Package)',
-        ]
-        
-        for pattern in usage_desc_patterns:
-            usage_match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        # A failed lazy multi-line search rescans the rest of the text for every way the
+        # leading whitespace can be split, so stop at the last possible terminator
+        usage_end = _search_end(TDS_USAGE_END_RE, folded)
+        for pattern in TDS_USAGE_PATTERNS:
+            usage_match = pattern.search(folded, 0, usage_end)
             if usage_match:
-                data['product_usage'] = usage_match.group(1).strip()
+                data['product_usage'] = _captured(usage_match, text).strip()
                 break
         
         # Extract storage conditions - enhanced
-        storage_patterns = [
-            r'Storage\s+Conditions\s*(.+?)(?:\n\n|Shelf)',
-            r'Storage\s*[:\-]?\s*(.+?)(?:\n\n|Shelf)',
-            r'存储条件\s*[:\-]?\s*(.+?)(?:\n\n|$)',  # Chinese
-        ]
-        
-        for pattern in storage_patterns:
-            storage_match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        storage_end = _search_end(TDS_STORAGE_END_RE, folded)
+        for pattern in TDS_STORAGE_PATTERNS:
+            # The Chinese pattern may also run to the end of the text
+            endpos = len(text) if pattern is TDS_STORAGE_PATTERNS[-1] else storage_end
+            storage_match = pattern.search(folded, 0, endpos)
             if storage_match:
-                data['storage_conditions'] = storage_match.group(1).strip()
+                data['storage_conditions'] = _captured(storage_match, text).strip()
                 break
         
         # Extract shelf life - enhanced
-        shelf_patterns = [
-            r'Shelf\s+life\s*(.+?)(?:\n|$)',
-            r'Shelf\s*life\s*[:\-]?\s*(.+?)(?:\n|$)',
-            r'有效期\s*[:\-]?\s*(.+?)(?:\n|$)',  # Chinese
-        ]
-        
-        for pattern in shelf_patterns:
-            shelf_match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in TDS_SHELF_LIFE_PATTERNS:
+            shelf_match = pattern.search(folded)
             if shelf_match:
-                data['shelf_life'] = shelf_match.group(1).strip()
+                data['shelf_life'] = _captured(shelf_match, text).strip()
                 break
         
         return data
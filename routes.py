@@ -1,10 +1,18 @@
 import os
-import json
+import re
+import time
+import hashlib
+import functools
 import zipfile
+import unicodedata
+import urllib.parse
 import tempfile
-from datetime import datetime
-from flask import render_template, request, redirect, url_for, flash, send_file, current_app, jsonify, session
-from werkzeug.utils import secure_filename
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from flask import render_template, request, redirect, url_for, flash, send_file, current_app, jsonify, session, copy_current_request_context, abort, Response
+from sqlalchemy import insert, update, func, cast, literal, Text, or_
+from sqlalchemy.dialects.postgresql import JSONB, array
+from sqlalchemy.orm.attributes import flag_modified
 from app import app, db
 from models import DocumentSet, TestResult
 from pdf_processor import PDFProcessor
@@ -12,9 +20,123 @@ from document_generator import DocumentGenerator
 from mistral_service import MistralService
 
 ALLOWED_EXTENSIONS = {'pdf'}
+ALLOWED_FILE_RE = re.compile(r'\.(?:%s)\Z' % '|'.join(map(re.escape, ALLOWED_EXTENSIONS)), re.IGNORECASE)
+
+# Runs of characters replaced by '_' in the product name part of download filenames
+DOWNLOAD_NAME_UNSAFE_RE = re.compile(r'[^\w.-]+')
+
+# Uploads are copied to disk and hashed in chunks of this size
+UPLOAD_COPY_BUFFER = 1024 * 1024
+
+# Generated documents are read into the streamed ZIP download in chunks of this size
+ZIP_STREAM_BUFFER = 256 * 1024
+
+# DocumentSet columns holding each document type's supplier and generated files
+SUPPLIER_PATH_ATTRS = {'coa': 'supplier_coa_path', 'msds': 'supplier_msds_path', 'tds': 'supplier_tds_path'}
+GENERATED_PATH_ATTRS = {'coa': 'generated_coa_path', 'msds': 'generated_msds_path', 'tds': 'generated_tds_path'}
+
+PREVIEW_GENERATORS = {
+    'coa': DocumentGenerator.generate_preview_coa,
+    'msds': DocumentGenerator.generate_preview_msds,
+    'tds': DocumentGenerator.generate_preview_tds,
+}
+
+# DocumentSet columns that the editor may update directly, mirrored into extracted_data
+DOC_SET_TEXT_FIELDS = {'company_product_name', 'inci_name', 'cas_number', 'molecular_formula',
+                       'batch_number', 'supplier_name'}
+DOC_SET_DATE_FIELDS = {'manufacturing_date', 'expiry_date'}
+
+# extracted_data sections edited as '<section>.<key>'
+NESTED_DATA_FIELDS = {'physical_properties', 'safety_data'}
+
+# Uploads are extracted and generated off the request thread, a few at a time
+PROCESSING_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+
+# Jobs live only in this process, so a set still pending after this long was lost to a restart or crash
+PROCESSING_TIMEOUT = timedelta(minutes=30)
+PROCESSING_INTERRUPTED = 'Processing was interrupted; please try again'
+
+def _start_processing(doc_set, job, *args):
+    """Mark a document set pending and run job(*args) in the background"""
+    doc_set.status = 'pending'
+    doc_set.processing_started_at = datetime.utcnow()
+    db.session.commit()
+    PROCESSING_EXECUTOR.submit(copy_current_request_context(job), *args)
+
+def _fail_if_interrupted(doc_set_id):
+    """Mark a set whose background job has outlived PROCESSING_TIMEOUT as failed; returns whether it was"""
+    cutoff = datetime.utcnow() - PROCESSING_TIMEOUT
+    result = db.session.execute(
+        update(DocumentSet)
+        .where(DocumentSet.id == doc_set_id, DocumentSet.status == 'pending',
+               or_(DocumentSet.processing_started_at.is_(None), DocumentSet.processing_started_at < cutoff))
+        .values(status='error', processing_error=PROCESSING_INTERRUPTED)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount > 0
 
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return ALLOWED_FILE_RE.search(filename) is not None
+
+def _save_upload(file, folder):
+    """Save an uploaded PDF under its content hash, reusing an identical earlier upload"""
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as dst:
+            for chunk in iter(lambda: file.stream.read(UPLOAD_COPY_BUFFER), b''):
+                digest.update(chunk)
+                dst.write(chunk)
+        filepath = os.path.join(folder, f"{digest.hexdigest()}.pdf")
+        if os.path.exists(filepath):
+            os.unlink(tmp_path)
+        else:
+            os.replace(tmp_path, filepath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return filepath
+
+def _server_side_json():
+    """Whether extracted_data is JSONB that can be edited in place by the database"""
+    return db.engine.dialect.name == 'postgresql'
+
+def _specifications_update(doc_set_id, build, spec_name=None):
+    """Rewrite extracted_data['specifications'] in a single UPDATE, returning whether a row matched"""
+    # A missing document may be stored as SQL NULL or as JSON null
+    data = func.coalesce(func.nullif(cast(DocumentSet.extracted_data, JSONB), cast(literal('null'), JSONB), type_=JSONB),
+                         func.jsonb_build_object())
+    specs = func.coalesce(data['specifications'], func.jsonb_build_object())
+    stmt = (update(DocumentSet)
+            .where(DocumentSet.id == doc_set_id)
+            .values(extracted_data=func.jsonb_set(data, array(['specifications']), build(specs)))
+            .execution_options(synchronize_session=False))
+    if spec_name is not None:
+        # Only touch documents that actually have this specification
+        stmt = stmt.where(specs.has_key(spec_name))
+    matched = db.session.execute(stmt).rowcount > 0
+    db.session.commit()
+    return matched
+
+def _json_object(key, value):
+    """A one-key JSONB object with the value bound as a JSON parameter"""
+    return func.jsonb_build_object(cast(literal(key), Text), cast(literal(value, JSONB), JSONB))
+
+def _download_name(doc_set, kind, extension='pdf'):
+    """Filename for a branded download, e.g. NTCB_COA_<product>.pdf"""
+    return f"NTCB_{kind}_{DOWNLOAD_NAME_UNSAFE_RE.sub('_', doc_set.company_product_name)}.{extension}"
+
+@functools.lru_cache(maxsize=1024)
+def _parse_date(value, date_format):
+    """Parse a date string; the same dates recur across uploads and edits, so results are memoized"""
+    # The two formats the app uses skip strptime's format parsing
+    if date_format == '%Y-%m-%d':
+        return date.fromisoformat(value)
+    if date_format == '%d-%m-%Y':
+        day, month, year = value.split('-')
+        return date(int(year), int(month), int(day))
+    return datetime.strptime(value, date_format).date()
 
 @app.route('/')
 def index():
@@ -23,7 +145,10 @@ def index():
 
 @app.route('/home')
 def home():
-    recent_documents = DocumentSet.query.order_by(DocumentSet.created_at.desc()).limit(5).all()
+    # Only the columns the list shows; extracted_data can be large
+    recent_documents = db.session.query(
+        DocumentSet.id, DocumentSet.company_product_name, DocumentSet.created_at
+    ).order_by(DocumentSet.created_at.desc()).limit(5).all()
     return render_template('index.html', recent_documents=recent_documents)
 
 @app.route('/upload-pipeline')
@@ -74,70 +199,16 @@ def upload():
             # Save uploaded files
             saved_files = {}
             for doc_type, file in files.items():
-                filename = secure_filename(f"{doc_set.id}_{doc_type}_{file.filename}")
-                filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
+                filepath = _save_upload(file, current_app.config['UPLOAD_FOLDER'])
                 saved_files[doc_type] = filepath
                 
                 # Update document set with file paths
-                if doc_type == 'coa':
-                    doc_set.supplier_coa_path = filepath
-                elif doc_type == 'msds':
-                    doc_set.supplier_msds_path = filepath
-                elif doc_type == 'tds':
-                    doc_set.supplier_tds_path = filepath
-            
-            # Process PDFs and extract data
-            processor = PDFProcessor()
-            extracted_data = processor.process_documents(saved_files)
-            
-            # Update document set with extracted data
-            doc_set.original_product_name = extracted_data.get('product_name', '')
-            doc_set.supplier_name = extracted_data.get('supplier_name', '')
-            doc_set.cas_number = extracted_data.get('cas_number', '')
-            doc_set.inci_name = extracted_data.get('inci_name', '')
-            doc_set.molecular_formula = extracted_data.get('molecular_formula', '')
-            doc_set.batch_number = extracted_data.get('batch_number', '')
-            
-            # Parse dates if available
-            if extracted_data.get('manufacturing_date'):
-                try:
-                    doc_set.manufacturing_date = datetime.strptime(extracted_data['manufacturing_date'], '%d-%m-%Y').date()
-                except:
-                    pass
-            
-            if extracted_data.get('expiry_date'):
-                try:
-                    doc_set.expiry_date = datetime.strptime(extracted_data['expiry_date'], '%d-%m-%Y').date()
-                except:
-                    pass
-            
-            doc_set.extracted_data = json.dumps(extracted_data)
-            
-            # Save test results
-            for test in extracted_data.get('test_results', []):
-                test_result = TestResult(
-                    document_set_id=doc_set.id,
-                    test_item=test.get('test_item', ''),
-                    specification=test.get('specification', ''),
-                    result=test.get('result', ''),
-                    document_type=test.get('document_type', 'COA')
-                )
-                db.session.add(test_result)
+                setattr(doc_set, SUPPLIER_PATH_ATTRS[doc_type], filepath)
             
-            # Generate new documents
-            generator = DocumentGenerator()
-            generated_files = generator.generate_documents(doc_set, extracted_data)
+            # Extract and generate in the background so the upload request returns right away
+            _start_processing(doc_set, process_and_generate, doc_set.id, saved_files)
             
-            # Update document set with generated file paths
-            doc_set.generated_coa_path = generated_files.get('coa')
-            doc_set.generated_msds_path = generated_files.get('msds')
-            doc_set.generated_tds_path = generated_files.get('tds')
-            
-            db.session.commit()
-            
-            flash('Documents processed successfully!', 'success')
-            return redirect(url_for('edit_preview', doc_set_id=doc_set.id))
+            return redirect(url_for('processing_status', doc_set_id=doc_set.id))
             
         except Exception as e:
             db.session.rollback()
@@ -147,73 +218,146 @@ def upload():
     
     return render_template('upload.html')
 
+def process_and_generate(doc_set_id, saved_files):
+    """Extract data from the uploaded PDFs and generate the branded documents for a document set"""
+    doc_set = db.session.get(DocumentSet, doc_set_id)
+    try:
+        # Process PDFs and extract data
+        processor = PDFProcessor()
+        extracted_data = processor.process_documents(saved_files)
+        
+        # Update document set with extracted data
+        doc_set.original_product_name = extracted_data.get('product_name', '')
+        doc_set.supplier_name = extracted_data.get('supplier_name', '')
+        doc_set.cas_number = extracted_data.get('cas_number', '')
+        doc_set.inci_name = extracted_data.get('inci_name', '')
+        doc_set.molecular_formula = extracted_data.get('molecular_formula', '')
+        doc_set.batch_number = extracted_data.get('batch_number', '')
+        
+        # Parse dates if available
+        if extracted_data.get('manufacturing_date'):
+            try:
+                doc_set.manufacturing_date = _parse_date(extracted_data['manufacturing_date'], '%d-%m-%Y')
+            except ValueError:
+                pass
+        
+        if extracted_data.get('expiry_date'):
+            try:
+                doc_set.expiry_date = _parse_date(extracted_data['expiry_date'], '%d-%m-%Y')
+            except ValueError:
+                pass
+        
+        doc_set.extracted_data = extracted_data
+        
+        # Save test results in a single bulk INSERT
+        test_rows = [{
+            'document_set_id': doc_set.id,
+            'test_item': test.get('test_item', ''),
+            'specification': test.get('specification', ''),
+            'result': test.get('result', ''),
+            'document_type': test.get('document_type', 'COA')
+        } for test in extracted_data.get('test_results', [])]
+        if test_rows:
+            # Leave the DocumentSet changes for the single flush at commit
+            with db.session.no_autoflush:
+                db.session.execute(insert(TestResult), test_rows)
+        
+        # Generate new documents
+        generator = DocumentGenerator()
+        generated_files = generator.generate_documents(doc_set, extracted_data)
+        
+        # Update document set with generated file paths
+        doc_set.generated_coa_path = generated_files.get('coa')
+        doc_set.generated_msds_path = generated_files.get('msds')
+        doc_set.generated_tds_path = generated_files.get('tds')
+        # Lets finalize skip regenerating when nothing shown has changed
+        extracted_data['generated_digest'] = generator.input_digest(doc_set, extracted_data)
+        flag_modified(doc_set, 'extracted_data')
+        
+        doc_set.status = 'done'
+        db.session.commit()
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error processing documents: {str(e)}")
+        doc_set = db.session.get(DocumentSet, doc_set_id)
+        doc_set.status = 'error'
+        doc_set.processing_error = str(e)
+        db.session.commit()
+
+@app.route('/processing/<int:doc_set_id>')
+def processing_status(doc_set_id):
+    doc_set = db.get_or_404(DocumentSet, doc_set_id)
+    if doc_set.status == 'pending' and _fail_if_interrupted(doc_set.id):
+        db.session.refresh(doc_set)
+    # Signed sets are here because finalizing regenerates their documents
+    signed = (doc_set.extracted_data or {}).get('status') == 'signed'
+    if doc_set.status == 'error':
+        if signed:
+            flash(f'Error finalizing documents: {doc_set.processing_error}', 'error')
+            return redirect(url_for('sign_documents', doc_set_id=doc_set.id))
+        flash(f'Error processing documents: {doc_set.processing_error}', 'error')
+        return redirect(url_for('upload'))
+    if doc_set.status != 'pending':
+        if signed:
+            flash('Documents finalized and signed successfully!', 'success')
+            return redirect(url_for('results', doc_set_id=doc_set.id))
+        flash('Documents processed successfully!', 'success')
+        return redirect(url_for('edit_preview', doc_set_id=doc_set.id))
+    return render_template('processing.html', doc_set=doc_set)
+
+@app.route('/api/status/<int:doc_set_id>')
+def document_status(doc_set_id):
+    row = db.session.query(DocumentSet.status).filter(DocumentSet.id == doc_set_id).one_or_none()
+    if row is None:
+        abort(404)
+    status = row.status or 'done'
+    if status == 'pending' and _fail_if_interrupted(doc_set_id):
+        status = 'error'
+    return jsonify({'status': status})
+
 @app.route('/edit/<int:doc_set_id>')  
 def edit_preview(doc_set_id):
-    doc_set = DocumentSet.query.get_or_404(doc_set_id)
-    extracted_data = json.loads(doc_set.extracted_data) if doc_set.extracted_data else {}
+    doc_set = db.get_or_404(DocumentSet, doc_set_id)
+    if doc_set.status == 'pending':
+        return redirect(url_for('processing_status', doc_set_id=doc_set.id))
+    extracted_data = doc_set.extracted_data or {}
     return render_template('edit_preview.html', doc_set=doc_set, extracted_data=extracted_data)
 
 @app.route('/api/update-field/<int:doc_set_id>', methods=['POST'])
 def update_field(doc_set_id):
-    doc_set = DocumentSet.query.get_or_404(doc_set_id)
+    doc_set = db.get_or_404(DocumentSet, doc_set_id)
     data = request.get_json()
     
     field_name = data.get('field_name')
     field_value = data.get('field_value')
     
     # Get extracted data
-    extracted_data = json.loads(doc_set.extracted_data) if doc_set.extracted_data else {}
+    extracted_data = doc_set.extracted_data or {}
+    
+    section, dot, key = field_name.partition('.')
     
     # Update the field in the document set and extracted_data
-    if field_name == 'company_product_name':
-        doc_set.company_product_name = field_value
-        extracted_data[field_name] = field_value
-    elif field_name == 'inci_name':
-        doc_set.inci_name = field_value
-        extracted_data[field_name] = field_value
-    elif field_name == 'cas_number':
-        doc_set.cas_number = field_value
-        extracted_data[field_name] = field_value
-    elif field_name == 'molecular_formula':
-        doc_set.molecular_formula = field_value
+    if field_name in DOC_SET_TEXT_FIELDS:
+        setattr(doc_set, field_name, field_value)
         extracted_data[field_name] = field_value
-    elif field_name == 'batch_number':
-        doc_set.batch_number = field_value
-        extracted_data[field_name] = field_value
-    elif field_name == 'supplier_name':
-        doc_set.supplier_name = field_value
-        extracted_data[field_name] = field_value
-    elif field_name in ['manufacturing_date', 'expiry_date']:
+    elif field_name in DOC_SET_DATE_FIELDS:
         try:
-            date_value = datetime.strptime(field_value, '%Y-%m-%d').date()
-            if field_name == 'manufacturing_date':
-                doc_set.manufacturing_date = date_value
-            else:
-                doc_set.expiry_date = date_value
+            setattr(doc_set, field_name, _parse_date(field_value, '%Y-%m-%d'))
             extracted_data[field_name] = field_value
         except ValueError:
             return jsonify({'error': 'Invalid date format'}), 400
-    elif field_name in ['recommended_use_level', 'use_method', 'storage_conditions', 'shelf_life']:
-        # Direct fields in extracted_data
-        extracted_data[field_name] = field_value
-    elif field_name.startswith('physical_properties.'):
-        # Handle nested physical properties
-        property_name = field_name.split('.')[1]
-        if 'physical_properties' not in extracted_data:
-            extracted_data['physical_properties'] = {}
-        extracted_data['physical_properties'][property_name] = field_value
-    elif field_name.startswith('safety_data.'):
-        # Handle nested safety data
-        safety_name = field_name.split('.')[1]
-        if 'safety_data' not in extracted_data:
-            extracted_data['safety_data'] = {}
-        extracted_data['safety_data'][safety_name] = field_value
+    elif dot and section in NESTED_DATA_FIELDS:
+        # Nested physical properties and safety data
+        extracted_data.setdefault(section, {})[key.split('.')[0]] = field_value
     else:
-        # Generic field update for any other fields
+        # Any other field lives directly in extracted_data
         extracted_data[field_name] = field_value
     
     # Update extracted_data JSON
-    doc_set.extracted_data = json.dumps(extracted_data)
+    doc_set.extracted_data = extracted_data
+    # Edits happen in place, which the JSON column can't detect on its own
+    flag_modified(doc_set, 'extracted_data')
     
     db.session.commit()
     
@@ -221,7 +365,6 @@ def update_field(doc_set_id):
 
 @app.route('/api/update-specification/<int:doc_set_id>', methods=['POST'])
 def update_specification(doc_set_id):
-    doc_set = DocumentSet.query.get_or_404(doc_set_id)
     data = request.get_json()
     
     spec_name = data.get('spec_name')
@@ -230,15 +373,23 @@ def update_specification(doc_set_id):
     if not spec_name:
         return jsonify({'error': 'Specification name is required'}), 400
     
+    if _server_side_json():
+        if not _specifications_update(doc_set_id, lambda specs: specs.op('||')(_json_object(spec_name, spec_value))):
+            abort(404)
+        return jsonify({'success': True, 'spec_name': spec_name, 'spec_value': spec_value})
+    
+    doc_set = db.get_or_404(DocumentSet, doc_set_id)
+    
     # Get extracted data
-    extracted_data = json.loads(doc_set.extracted_data) if doc_set.extracted_data else {}
+    extracted_data = doc_set.extracted_data or {}
     
     # Update specification
     if 'specifications' not in extracted_data:
         extracted_data['specifications'] = {}
     
     extracted_data['specifications'][spec_name] = spec_value
-    doc_set.extracted_data = json.dumps(extracted_data)
+    doc_set.extracted_data = extracted_data
+    flag_modified(doc_set, 'extracted_data')
     
     db.session.commit()
     
@@ -246,7 +397,6 @@ def update_specification(doc_set_id):
 
 @app.route('/api/rename-specification/<int:doc_set_id>', methods=['POST'])
 def rename_specification(doc_set_id):
-    doc_set = DocumentSet.query.get_or_404(doc_set_id)
     data = request.get_json()
     
     old_name = data.get('old_name')
@@ -255,8 +405,19 @@ def rename_specification(doc_set_id):
     if not old_name or not new_name:
         return jsonify({'error': 'Both old and new names are required'}), 400
     
+    if _server_side_json():
+        def rename(specs):
+            moved = func.jsonb_build_object(cast(literal(new_name), Text), specs.op('->')(cast(literal(old_name), Text)))
+            return specs.op('-')(cast(literal(old_name), Text)).op('||')(moved)
+        if not _specifications_update(doc_set_id, rename, spec_name=old_name):
+            db.get_or_404(DocumentSet, doc_set_id)
+            return jsonify({'error': 'Specification not found'}), 404
+        return jsonify({'success': True, 'old_name': old_name, 'new_name': new_name})
+    
+    doc_set = db.get_or_404(DocumentSet, doc_set_id)
+    
     # Get extracted data
-    extracted_data = json.loads(doc_set.extracted_data) if doc_set.extracted_data else {}
+    extracted_data = doc_set.extracted_data or {}
     
     if 'specifications' not in extracted_data:
         return jsonify({'error': 'No specifications found'}), 404
@@ -269,7 +430,8 @@ def rename_specification(doc_set_id):
     del extracted_data['specifications'][old_name]
     extracted_data['specifications'][new_name] = spec_value
     
-    doc_set.extracted_data = json.dumps(extracted_data)
+    doc_set.extracted_data = extracted_data
+    flag_modified(doc_set, 'extracted_data')
     
     db.session.commit()
     
@@ -277,7 +439,6 @@ def rename_specification(doc_set_id):
 
 @app.route('/api/remove-specification/<int:doc_set_id>', methods=['POST'])
 def remove_specification(doc_set_id):
-    doc_set = DocumentSet.query.get_or_404(doc_set_id)
     data = request.get_json()
     
     spec_name = data.get('spec_name')
@@ -285,8 +446,17 @@ def remove_specification(doc_set_id):
     if not spec_name:
         return jsonify({'error': 'Specification name is required'}), 400
     
+    if _server_side_json():
+        if not _specifications_update(doc_set_id, lambda specs: specs.op('-')(cast(literal(spec_name), Text)),
+                                      spec_name=spec_name):
+            db.get_or_404(DocumentSet, doc_set_id)
+            return jsonify({'error': 'Specification not found'}), 404
+        return jsonify({'success': True, 'spec_name': spec_name})
+    
+    doc_set = db.get_or_404(DocumentSet, doc_set_id)
+    
     # Get extracted data
-    extracted_data = json.loads(doc_set.extracted_data) if doc_set.extracted_data else {}
+    extracted_data = doc_set.extracted_data or {}
     
     if 'specifications' not in extracted_data:
         return jsonify({'error': 'No specifications found'}), 404
@@ -297,29 +467,59 @@ def remove_specification(doc_set_id):
     # Remove the specification
     del extracted_data['specifications'][spec_name]
     
-    doc_set.extracted_data = json.dumps(extracted_data)
+    doc_set.extracted_data = extracted_data
+    flag_modified(doc_set, 'extracted_data')
     
     db.session.commit()
     
     return jsonify({'success': True, 'spec_name': spec_name})
 
+@app.route('/api/specifications/<int:doc_set_id>', methods=['PATCH'])
+def patch_specifications(doc_set_id):
+    """Apply a batch of set/rename/remove specification edits in one transaction"""
+    ops = (request.get_json(silent=True) or {}).get('ops')
+    if not isinstance(ops, list) or not ops:
+        return jsonify({'error': 'A list of operations is required'}), 400
+    
+    # Lock the row so concurrent batches don't overwrite each other
+    doc_set = db.get_or_404(DocumentSet, doc_set_id, with_for_update=True)
+    extracted_data = doc_set.extracted_data or {}
+    specs = extracted_data.setdefault('specifications', {})
+    
+    for op in ops:
+        kind = op.get('op') if isinstance(op, dict) else None
+        if kind == 'set' and op.get('name'):
+            specs[op['name']] = op.get('value')
+        elif kind == 'rename' and op.get('old') and op.get('new'):
+            if op['old'] not in specs:
+                db.session.rollback()
+                return jsonify({'error': f"Specification not found: {op['old']}"}), 404
+            specs[op['new']] = specs.pop(op['old'])
+        elif kind == 'remove' and op.get('name'):
+            # Removing a specification that is already gone is not an error
+            specs.pop(op['name'], None)
+        else:
+            db.session.rollback()
+            return jsonify({'error': 'Invalid operation'}), 400
+    
+    doc_set.extracted_data = extracted_data
+    flag_modified(doc_set, 'extracted_data')
+    
+    db.session.commit()
+    
+    return jsonify({'success': True, 'specifications': specs})
+
 @app.route('/api/preview/<int:doc_set_id>/<doc_type>')
 def preview_document(doc_set_id, doc_type):
-    doc_set = DocumentSet.query.get_or_404(doc_set_id)
-    extracted_data = json.loads(doc_set.extracted_data) if doc_set.extracted_data else {}
+    doc_set = db.get_or_404(DocumentSet, doc_set_id)
+    extracted_data = doc_set.extracted_data or {}
+    
+    generate_preview = PREVIEW_GENERATORS.get(doc_type)
+    if generate_preview is None:
+        return jsonify({'error': 'Invalid document type'}), 400
     
     try:
-        generator = DocumentGenerator()
-        
-        if doc_type == 'coa':
-            preview_path = generator.generate_preview_coa(doc_set, extracted_data)
-        elif doc_type == 'msds':
-            preview_path = generator.generate_preview_msds(doc_set, extracted_data)
-        elif doc_type == 'tds':
-            preview_path = generator.generate_preview_tds(doc_set, extracted_data)
-        else:
-            return jsonify({'error': 'Invalid document type'}), 400
-        
+        preview_path = generate_preview(DocumentGenerator(), doc_set, extracted_data)
         return send_file(preview_path, mimetype='application/pdf')
         
     except Exception as e:
@@ -328,13 +528,14 @@ def preview_document(doc_set_id, doc_type):
 
 @app.route('/approve/<int:doc_set_id>', methods=['POST'])
 def approve_documents(doc_set_id):
-    doc_set = DocumentSet.query.get_or_404(doc_set_id)
+    doc_set = db.get_or_404(DocumentSet, doc_set_id)
     
     # Update document status (we'll add this field to the model)
-    extracted_data = json.loads(doc_set.extracted_data) if doc_set.extracted_data else {}
+    extracted_data = doc_set.extracted_data or {}
     extracted_data['status'] = 'approved'
     extracted_data['approved_at'] = datetime.now().isoformat()
-    doc_set.extracted_data = json.dumps(extracted_data)
+    doc_set.extracted_data = extracted_data
+    flag_modified(doc_set, 'extracted_data')
     
     db.session.commit()
     
@@ -342,13 +543,13 @@ def approve_documents(doc_set_id):
 
 @app.route('/sign/<int:doc_set_id>')
 def sign_documents(doc_set_id):
-    doc_set = DocumentSet.query.get_or_404(doc_set_id)
-    extracted_data = json.loads(doc_set.extracted_data) if doc_set.extracted_data else {}
+    doc_set = db.get_or_404(DocumentSet, doc_set_id)
+    extracted_data = doc_set.extracted_data or {}
     return render_template('sign_documents.html', doc_set=doc_set, extracted_data=extracted_data)
 
 @app.route('/finalize/<int:doc_set_id>', methods=['POST'])
 def finalize_documents(doc_set_id):
-    doc_set = DocumentSet.query.get_or_404(doc_set_id)
+    doc_set = db.get_or_404(DocumentSet, doc_set_id)
     
     # Get signature data from form
     signature_name = request.form.get('signature_name', '').strip()
@@ -359,98 +560,165 @@ def finalize_documents(doc_set_id):
         return redirect(url_for('sign_documents', doc_set_id=doc_set_id))
     
     # Update extracted data with signature
-    extracted_data = json.loads(doc_set.extracted_data) if doc_set.extracted_data else {}
+    # One timestamp so the signing time and signature date always agree
+    now = datetime.now()
+    extracted_data = doc_set.extracted_data or {}
     extracted_data['status'] = 'signed'
-    extracted_data['signed_at'] = datetime.now().isoformat()
+    extracted_data['signed_at'] = now.isoformat()
     extracted_data['signature'] = {
         'name': signature_name,
         'title': signature_title,
-        'date': datetime.now().strftime('%d-%m-%Y')
+        'date': now.strftime('%d-%m-%Y')
     }
-    doc_set.extracted_data = json.dumps(extracted_data)
+    doc_set.extracted_data = extracted_data
+    flag_modified(doc_set, 'extracted_data')
     
-    # Regenerate documents with signature
+    # Regenerate documents only if something they show changed since they were generated;
+    # the signature itself is not rendered
+    try:
+        digest = DocumentGenerator().input_digest(doc_set, extracted_data)
+        generated_paths = (doc_set.generated_coa_path, doc_set.generated_msds_path, doc_set.generated_tds_path)
+        if extracted_data.get('generated_digest') != digest or not all(
+                path and os.path.exists(path) for path in generated_paths):
+            # Regenerate in the background and wait on the processing page
+            _start_processing(doc_set, regenerate_documents, doc_set.id)
+            return redirect(url_for('processing_status', doc_set_id=doc_set.id))
+        
+        db.session.commit()
+        
+        flash('Documents finalized and signed successfully!', 'success')
+        return redirect(url_for('results', doc_set_id=doc_set_id))
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error finalizing documents: {str(e)}")
+        flash(f'Error finalizing documents: {str(e)}', 'error')
+        return redirect(url_for('sign_documents', doc_set_id=doc_set_id))
+
+def regenerate_documents(doc_set_id):
+    """Regenerate the branded documents for a document set after it has been edited"""
+    doc_set = db.session.get(DocumentSet, doc_set_id)
     try:
         generator = DocumentGenerator()
+        extracted_data = doc_set.extracted_data or {}
         generated_files = generator.generate_documents(doc_set, extracted_data)
         
         doc_set.generated_coa_path = generated_files.get('coa')
         doc_set.generated_msds_path = generated_files.get('msds')
         doc_set.generated_tds_path = generated_files.get('tds')
+        extracted_data['generated_digest'] = generator.input_digest(doc_set, extracted_data)
+        flag_modified(doc_set, 'extracted_data')
         
+        doc_set.status = 'done'
         db.session.commit()
         
-        flash('Documents finalized and signed successfully!', 'success')
-        return redirect(url_for('results', doc_set_id=doc_set_id))
-        
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error finalizing documents: {str(e)}")
-        flash(f'Error finalizing documents: {str(e)}', 'error')
-        return redirect(url_for('sign_documents', doc_set_id=doc_set_id))
+        doc_set = db.session.get(DocumentSet, doc_set_id)
+        doc_set.status = 'error'
+        doc_set.processing_error = str(e)
+        db.session.commit()
 
 @app.route('/results/<int:doc_set_id>')
 def results(doc_set_id):
-    doc_set = DocumentSet.query.get_or_404(doc_set_id)
-    extracted_data = json.loads(doc_set.extracted_data) if doc_set.extracted_data else {}
-    return render_template('results.html', doc_set=doc_set, extracted_data=extracted_data)
+    doc_set = db.get_or_404(DocumentSet, doc_set_id)
+    if doc_set.status == 'pending':
+        return redirect(url_for('processing_status', doc_set_id=doc_set.id))
+    extracted_data = doc_set.extracted_data or {}
+    return render_template('results.html', doc_set=doc_set, extracted_data=extracted_data,
+                           test_summary=doc_set.test_summary())
 
 @app.route('/download/<int:doc_set_id>/<doc_type>')
 def download(doc_set_id, doc_type):
-    doc_set = DocumentSet.query.get_or_404(doc_set_id)
+    doc_set = db.get_or_404(DocumentSet, doc_set_id)
     
-    file_path = None
-    if doc_type == 'coa':
-        file_path = doc_set.generated_coa_path
-    elif doc_type == 'msds':
-        file_path = doc_set.generated_msds_path
-    elif doc_type == 'tds':
-        file_path = doc_set.generated_tds_path
+    path_attr = GENERATED_PATH_ATTRS.get(doc_type)
+    if path_attr is None:
+        abort(400)
     
+    file_path = getattr(doc_set, path_attr)
     if not file_path or not os.path.exists(file_path):
         flash('File not found', 'error')
         return redirect(url_for('results', doc_set_id=doc_set_id))
     
-    filename = f"NTCB_{doc_type.upper()}_{doc_set.company_product_name.replace(' ', '_')}.pdf"
+    filename = _download_name(doc_set, doc_type.upper())
     return send_file(file_path, as_attachment=True, download_name=filename)
 
 @app.route('/processed')
 def processed_documents():
-    documents = DocumentSet.query.order_by(DocumentSet.created_at.desc()).all()
+    # Only the columns the list shows; extracted_data can be large
+    documents = db.session.query(
+        DocumentSet.id, DocumentSet.company_product_name, DocumentSet.supplier_name, DocumentSet.batch_number,
+        DocumentSet.created_at, DocumentSet.generated_coa_path, DocumentSet.generated_msds_path,
+        DocumentSet.generated_tds_path
+    ).order_by(DocumentSet.created_at.desc()).all()
     return render_template('processed_documents.html', documents=documents)
 
-@app.route('/download-zip/<int:doc_set_id>')
-def download_zip(doc_set_id):
-    doc_set = DocumentSet.query.get_or_404(doc_set_id)
+class _ZipChunks:
+    """Write-only file object that collects what ZipFile writes so it can be streamed out"""
     
-    # Create a temporary zip file
-    temp_dir = tempfile.mkdtemp()
-    zip_path = os.path.join(temp_dir, f"NTCB_Documents_{doc_set.company_product_name.replace(' ', '_')}.zip")
+    def __init__(self):
+        self.chunks = []
     
-    try:
-        with zipfile.ZipFile(zip_path, 'w') as zip_file:
-            # Add COA if exists
-            if doc_set.generated_coa_path and os.path.exists(doc_set.generated_coa_path):
-                coa_name = f"NTCB_COA_{doc_set.company_product_name.replace(' ', '_')}.pdf"
-                zip_file.write(doc_set.generated_coa_path, coa_name)
-            
-            # Add MSDS if exists
-            if doc_set.generated_msds_path and os.path.exists(doc_set.generated_msds_path):
-                msds_name = f"NTCB_MSDS_{doc_set.company_product_name.replace(' ', '_')}.pdf"
-                zip_file.write(doc_set.generated_msds_path, msds_name)
-            
-            # Add TDS if exists
-            if doc_set.generated_tds_path and os.path.exists(doc_set.generated_tds_path):
-                tds_name = f"NTCB_TDS_{doc_set.company_product_name.replace(' ', '_')}.pdf"
-                zip_file.write(doc_set.generated_tds_path, tds_name)
-        
-        zip_filename = f"NTCB_Documents_{doc_set.company_product_name.replace(' ', '_')}.zip"
-        return send_file(zip_path, as_attachment=True, download_name=zip_filename)
-        
-    except Exception as e:
-        current_app.logger.error(f"Error creating zip file: {str(e)}")
-        flash('Error creating download package', 'error')
-        return redirect(url_for('results', doc_set_id=doc_set_id))
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return b''.join(chunks)
+
+def _stream_zip(entries):
+    """Yield a stored (uncompressed) ZIP archive of (path, ZipInfo) entries as it is built"""
+    sink = _ZipChunks()
+    # PDFs are already compressed, so the entries are stored as is
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as zip_file:
+        for path, info in entries:
+            with open(path, 'rb') as src, zip_file.open(info, 'w') as dst:
+                for chunk in iter(lambda: src.read(ZIP_STREAM_BUFFER), b''):
+                    dst.write(chunk)
+                    yield sink.drain()
+    # Central directory
+    yield sink.drain()
+
+@app.route('/download-zip/<int:doc_set_id>')
+def download_zip(doc_set_id):
+    doc_set = db.get_or_404(DocumentSet, doc_set_id)
+    
+    # Add each generated document that exists
+    entries = []
+    etag = hashlib.sha256()
+    for doc_type, path_attr in GENERATED_PATH_ATTRS.items():
+        path = getattr(doc_set, path_attr)
+        if not path:
+            continue
+        try:
+            # One stat per document serves the existence check, the ZIP header and the ETag
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        info = zipfile.ZipInfo(_download_name(doc_set, doc_type.upper()), time.localtime(stat.st_mtime)[:6])
+        info.file_size = stat.st_size
+        entries.append((path, info))
+        # The archive is fully determined by its entries' names, sizes and modification times
+        etag.update(f"{info.filename}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode())
+    
+    # Stream the archive as it is built instead of writing it to a temp file first
+    zip_filename = _download_name(doc_set, 'Documents', 'zip')
+    response = Response(_stream_zip(entries), mimetype='application/zip')
+    # Same filename handling as send_file, so non-ASCII product names survive
+    names = {'filename': zip_filename}
+    if not zip_filename.isascii():
+        names = {'filename': unicodedata.normalize('NFKD', zip_filename).encode('ascii', 'ignore').decode('ascii'),
+                 'filename*': "UTF-8''" + urllib.parse.quote(zip_filename, safe="!#$&+^`|~")}
+    response.headers.set('Content-Disposition', 'attachment', **names)
+    # Let browsers revalidate like send_file does for single documents
+    response.set_etag(etag.hexdigest()[:32])
+    return response.make_conditional(request)
 
 @app.errorhandler(413)
 def too_large(e):
@@ -468,8 +736,8 @@ def test_mistral_connection():
         if not api_key:
             return jsonify({'success': False, 'error': 'API key is required'}), 400
         
-        mistral_service = MistralService()
-        result = mistral_service.test_connection(api_key)
+        with MistralService() as mistral_service:
+            result = mistral_service.test_connection(api_key)
         
         return jsonify(result)
         
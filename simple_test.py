@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Simple test to verify enhanced PDF extraction"""
 
+import os
 from pdf_processor import PDFProcessor
 
 def test_basic_extraction():
@@ -20,6 +21,10 @@ def test_basic_extraction():
         print(f"\n{doc_type} Extraction:")
         print("-" * 40)
         
+        if not os.path.exists(file_path):
+            print(f"  File not found: {file_path}")
+            continue
+        
         try:
             if doc_type == 'TDS':
                 data = processor.extract_tds_data(file_path)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Test current extraction to see what's being extracted"""
 
+import os
 from pdf_processor import PDFProcessor
 import json
 
@@ -21,6 +22,10 @@ def test_current_extraction():
         print(f"{doc_type} Document:")
         print("-" * 30)
         
+        if not os.path.exists(file_path):
+            print(f"  File not found: {file_path}\n")
+            continue
+        
         try:
             if doc_type == 'TDS':
                 data = processor.extract_tds_data(file_path)
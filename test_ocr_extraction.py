@@ -1,12 +1,46 @@
 #!/usr/bin/env python3
-"""Test OCR extraction directly"""
+"""Test OCR extraction directly
 
+OCR output is cached per file content; pass --fresh to run OCR again.
+"""
+
+import os
+import sys
+import hashlib
+import tempfile
 import logging
 logging.basicConfig(level=logging.INFO)
 
-from pdf_processor import PDFProcessor
+from pdf_processor import PDFProcessor, PDF_CACHE_DIR, PDF_CACHE_VERSION
+
+def cached_ocr(processor, file_path, fresh=False):
+    """Return the OCR text of a PDF, reusing the result of an earlier run on the same file"""
+    with open(file_path, 'rb') as f:
+        digest = hashlib.file_digest(f, 'sha256').hexdigest()
+    cache_path = os.path.join(PDF_CACHE_DIR, f"ocr-v{PDF_CACHE_VERSION}-{digest}.txt")
+    if not fresh and os.path.exists(cache_path):
+        with open(cache_path, encoding='utf-8') as f:
+            return f.read()
+    
+    ocr_text = processor.extract_text_with_ocr(file_path)
+    
+    # Write atomically; a failed write only costs the next run a cache miss
+    tmp_path = None
+    try:
+        os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=PDF_CACHE_DIR, suffix='.tmp', delete=False) as f:
+            tmp_path = f.name
+            f.write(ocr_text)
+        os.replace(tmp_path, cache_path)
+        tmp_path = None
+    except OSError as e:
+        print(f"Could not cache OCR text: {e}")
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return ocr_text
 
-def test_ocr_extraction():
+def test_ocr_extraction(fresh=False):
     """Test OCR extraction on the supplier files"""
     processor = PDFProcessor()
     
@@ -21,9 +55,13 @@ def test_ocr_extraction():
         print(f"\n{doc_type} OCR Test:")
         print("=" * 50)
         
+        if not os.path.exists(file_path):
+            print(f"File not found: {file_path}")
+            continue
+        
         try:
             # Test direct OCR extraction
-            ocr_text = processor.extract_text_with_ocr(file_path)
+            ocr_text = cached_ocr(processor, file_path, fresh)
             print(f"OCR text length: {len(ocr_text)} characters")
             
             # Count pages in OCR output
@@ -33,9 +71,9 @@ def test_ocr_extraction():
             # Show first 500 characters
             preview = ocr_text[:500].replace('\n', ' ')
             print(f"Preview: {preview}...")
-            
+        
         except Exception as e:
             print(f"ERROR: {e}")
 
 if __name__ == "__main__":
-    test_ocr_extraction()
\ No newline at end of file
+    test_ocr_extraction(fresh='--fresh' in sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,4 @@
+import os
+
+# app reads its database URL on import; keep the tests off the real database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
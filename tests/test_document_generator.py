@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+
+import document_generator
+from app import app
+from document_generator import DocumentGenerator
+from models import DocumentSet
+
+
+def _write_pdf(doc_set, extracted_data, filepath):
+    with open(filepath, "wb") as f:
+        f.write(b"%PDF-1.4 preview")
+
+
+def test_preview_being_sent_survives_a_newer_render(tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "GENERATED_FOLDER", str(tmp_path))
+    doc_set = DocumentSet(id=1, company_product_name="Test")
+    generator = DocumentGenerator()
+    resolved = threading.Event()
+    rendered = threading.Event()
+    errors = []
+
+    def send_old_preview():
+        with app.app_context():
+            path = generator._preview(doc_set, {"product_name": "old"}, "COA", _write_pdf)
+        resolved.set()
+        rendered.wait(5)
+        try:
+            with open(path, "rb") as f:
+                f.read()
+        except OSError as e:
+            errors.append(e)
+
+    def render_new_preview():
+        resolved.wait(5)
+        with app.app_context():
+            generator._preview(doc_set, {"product_name": "new"}, "COA", _write_pdf)
+        rendered.set()
+
+    with app.app_context():
+        generator._preview(doc_set, {"product_name": "old"}, "COA", _write_pdf)
+    threads = [threading.Thread(target=send_old_preview), threading.Thread(target=render_new_preview)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+
+
+def test_unused_stale_previews_are_removed(tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "GENERATED_FOLDER", str(tmp_path))
+    doc_set = DocumentSet(id=1, company_product_name="Test")
+    generator = DocumentGenerator()
+
+    with app.app_context():
+        old_path = generator._preview(doc_set, {"product_name": "old"}, "COA", _write_pdf)
+        expired = time.time() - document_generator.PREVIEW_STALE_SECONDS - 1
+        os.utime(old_path, (expired, expired))
+        new_path = generator._preview(doc_set, {"product_name": "new"}, "COA", _write_pdf)
+
+    assert not os.path.exists(old_path)
+    assert os.path.exists(new_path)
@@ -0,0 +1,107 @@
+import os
+import re
+import time
+
+import pdf_processor
+from pdf_processor import PDFProcessor
+
+MSDS_TEXT = "--- PAGE 1 ---\nProduct name: Sodium Hyaluronate\nCAS No.: 9067-32-7\n"
+
+
+def test_msds_text_is_extracted_once(tmp_path, monkeypatch):
+    pdf_path = tmp_path / "msds.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 msds")
+    monkeypatch.setattr(pdf_processor, "PDF_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(PDFProcessor, "_mistral_ocr_enabled", lambda self: False)
+    calls = []
+    monkeypatch.setattr(PDFProcessor, "_extract_text",
+                        lambda self, path, max_pages=None: (calls.append(max_pages), (MSDS_TEXT, False))[1])
+    pdf_processor.TEXT_CACHE.clear()
+
+    data = PDFProcessor()._process_document("msds", str(pdf_path))
+
+    # Field extraction and the kept msds_text share one extraction of the whole file
+    assert calls == [None]
+    assert data["cas_number"] == "9067-32-7"
+    assert data["msds_text"] == MSDS_TEXT
+
+def test_case_insensitive_patterns_keep_uppercase_escapes():
+    pattern = r'\ACAS\W+No\.?\s*(\S+)\B\D*\Z'
+    compiled = pdf_processor._compile(pattern, re.IGNORECASE)
+    reference = re.compile(pattern, re.IGNORECASE)
+
+    for text in ("CAS No. 9067-32-7", "cas: 9067-32-7x", "CAS No 123", "CASNo 9067"):
+        expected = reference.search(text)
+        found = compiled.search(pdf_processor._fold(text))
+        assert bool(found) == bool(expected), text
+        if expected:
+            assert found.group(1) == expected.group(1).lower()
+
+def test_tds_header_split_across_lines_is_not_a_header(monkeypatch):
+    text = "Test\nItems Specification Result\nfoo   bar   baz\n"
+    monkeypatch.setattr(PDFProcessor, "extract_text_from_pdf", lambda self, path, max_pages=None: text)
+
+    data = PDFProcessor().extract_tds_data("tds.pdf")
+
+    assert data["specifications"] == {"foo": "bar"}
+
+
+def test_degraded_text_is_not_cached(tmp_path, monkeypatch):
+    pdf_path = tmp_path / "msds.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 msds")
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr(pdf_processor, "PDF_CACHE_DIR", str(cache_dir))
+    monkeypatch.setattr(PDFProcessor, "_mistral_ocr_enabled", lambda self: False)
+    results = [(MSDS_TEXT, True), (MSDS_TEXT, False)]
+    monkeypatch.setattr(PDFProcessor, "_extract_text", lambda self, path, max_pages=None: results.pop(0))
+    pdf_processor.TEXT_CACHE.clear()
+
+    # A failed OCR call is retried on the next run rather than remembered
+    PDFProcessor()._process_document("msds", str(pdf_path))
+    assert not cache_dir.exists()
+    PDFProcessor()._process_document("msds", str(pdf_path))
+    assert results == []
+    assert len(list(cache_dir.iterdir())) == 1
+
+
+def test_prune_cache_drops_old_and_excess_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_processor, "PDF_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(pdf_processor, "PDF_CACHE_MAX_FILES", 2)
+    now = time.time()
+    for name, age in (("new.json", 0), ("newer.json", -10), ("older.json", 100),
+                      ("expired.json", pdf_processor.PDF_CACHE_MAX_AGE + 1)):
+        path = tmp_path / name
+        path.write_text("{}")
+        os.utime(path, (now - age, now - age))
+
+    PDFProcessor()._prune_cache()
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["new.json", "newer.json"]
+
+
+def test_mistral_session_is_closed_when_page_rendering_fails(monkeypatch):
+    import mistral_service
+
+    closed = []
+
+    class FakeMistralService:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            closed.append(True)
+
+    def fail_to_render(*args, **kwargs):
+        raise OSError("poppler not installed")
+
+    monkeypatch.setattr(mistral_service, "MistralService", FakeMistralService)
+    monkeypatch.setattr(pdf_processor, "convert_from_path", fail_to_render, raising=False)
+    monkeypatch.setattr(PDFProcessor, "_mistral_ocr_enabled", lambda self: True)
+    monkeypatch.setattr(PDFProcessor, "extract_text_layer",
+                        lambda self, path, max_pages=None: ["Product name: Sodium Hyaluronate"])
+
+    text, degraded = PDFProcessor()._extract_text("scan.pdf")
+
+    assert closed == [True]
+    assert degraded
+    assert "Sodium Hyaluronate" in text
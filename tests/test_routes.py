@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import routes
+from app import app, db
+from models import DocumentSet
+
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        yield app.test_client()
+        db.session.rollback()
+
+
+def _pending_set(started_at):
+    doc_set = DocumentSet(original_product_name="", company_product_name="Test", supplier_name="",
+                          status="pending", processing_started_at=started_at)
+    db.session.add(doc_set)
+    db.session.commit()
+    return doc_set.id
+
+
+def test_status_of_unknown_set_is_404(client):
+    assert client.get("/api/status/999999").status_code == 404
+
+
+def test_running_set_stays_pending(client):
+    doc_set_id = _pending_set(datetime.utcnow())
+
+    assert client.get(f"/api/status/{doc_set_id}").get_json() == {"status": "pending"}
+
+
+def test_set_lost_by_its_worker_is_failed_after_timeout(client):
+    started_at = datetime.utcnow() - routes.PROCESSING_TIMEOUT - timedelta(minutes=1)
+    doc_set_id = _pending_set(started_at)
+
+    assert client.get(f"/api/status/{doc_set_id}").get_json() == {"status": "error"}
+    doc_set = db.session.get(DocumentSet, doc_set_id)
+    db.session.refresh(doc_set)
+    assert doc_set.status == "error"
+    assert doc_set.processing_error == routes.PROCESSING_INTERRUPTED